@@ -2,13 +2,18 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import sqlite3
 import os
+import re
+import uuid
 import logging
 from dotenv import load_dotenv
 
-from src.agent import DataAgent
-from src.tools import get_sample_queries, get_database_schema
+from src.session_store import session_store
+from src.tools import get_sample_queries, get_database_schema, get_query_cache_stats
+from src.connection_pool import get_connection_pool
+from src.dashboard_stats import dashboard_stats
+from src.template_cache import template_cache
+from src.tracing import tracer, summarize_turn, TRACE_PATH
 
 load_dotenv()
 
@@ -26,51 +31,20 @@ st.set_page_config(
 )
 
 DB_PATH = "data/ecommerce.db"
+SESSION_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
 
 
 def get_db_connection():
-    return sqlite3.connect(DB_PATH)
+    return get_connection_pool(DB_PATH).connection()
 
 
 def get_database_stats() -> dict:
-    conn = get_db_connection()
-
-    stats = {}
-
-    for table in ["customers", "products", "orders", "order_items"]:
-        cursor = conn.execute(f"SELECT COUNT(*) FROM {table}")
-        stats[f"{table}_count"] = cursor.fetchone()[0]
-
-    cursor = conn.execute(
-        "SELECT SUM(total_amount) FROM orders WHERE status = 'delivered'"
-    )
-    stats["total_revenue"] = cursor.fetchone()[0] or 0
-
-    cursor = conn.execute(
-        "SELECT AVG(total_amount) FROM orders WHERE status = 'delivered'"
-    )
-    stats["avg_order_value"] = cursor.fetchone()[0] or 0
-
-    cursor = conn.execute(
-        "SELECT status, COUNT(*) FROM orders GROUP BY status"
-    )
-    stats["orders_by_status"] = dict(cursor.fetchall())
-
-    cursor = conn.execute("""
-        SELECT p.category, SUM(oi.quantity * oi.unit_price) as revenue
-        FROM products p
-        JOIN order_items oi ON p.product_id = oi.product_id
-        GROUP BY p.category
-        ORDER BY revenue DESC
-    """)
-    stats["revenue_by_category"] = dict(cursor.fetchall())
-
-    conn.close()
-    return stats
+    return dashboard_stats.get(DB_PATH)
 
 
 def render_sidebar():
     st.sidebar.title("📊 Data Insights")
+    st.sidebar.caption("🔒 This page's URL identifies your conversation. Anyone you share it with can read and continue it.")
 
     stats = get_database_stats()
 
@@ -145,6 +119,28 @@ def render_sidebar():
                 st.session_state.sample_query = f"Run this query: {sq['query']}"
                 st.rerun()
 
+    with st.sidebar.expander("Query Cache"):
+        cache_stats = get_query_cache_stats()
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Hits", f"{cache_stats['hits']:,}")
+            st.metric("Entries", f"{cache_stats['entries']:,}")
+        with col2:
+            st.metric("Misses", f"{cache_stats['misses']:,}")
+            st.metric("Hit Rate", f"{cache_stats['hit_rate']:.0%}")
+
+    with st.sidebar.expander("SQL Templates"):
+        template_stats = template_cache.stats()
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Executed", f"{template_stats['executed']:,}")
+            st.metric("Hinted", f"{template_stats['hinted']:,}")
+            st.metric("Templates", f"{template_stats['templates']:,}")
+        with col2:
+            st.metric("Misses", f"{template_stats['misses']:,}")
+            st.metric("Failures", f"{template_stats['failures']:,}")
+            st.metric("Hit Rate", f"{template_stats['hit_rate']:.0%}")
+
     st.sidebar.divider()
     st.sidebar.header("Configuration")
 
@@ -173,28 +169,32 @@ def render_sidebar():
             st.success("Settings saved!")
 
 
+def get_session_id() -> str:
+    # Kept in the URL so a restart or another replica resumes the same conversation. The id is the
+    # only credential for it: anyone with the URL can read and continue the chat, so ids that are
+    # not random 128-bit values (e.g. hand-typed ?session=test) are replaced rather than shared.
+    session_id = st.query_params.get("session")
+    if not session_id or not SESSION_ID_PATTERN.fullmatch(session_id):
+        session_id = uuid.uuid4().hex
+        st.query_params["session"] = session_id
+    return session_id
+
+
 def initialize_agent():
-    if "agent" not in st.session_state:
-        api_key = os.environ.get("OPENAI_API_KEY", "")
-        if not api_key:
-            st.error("Please set the OPENAI_API_KEY environment variable.")
-            st.stop()
-
-        config = {
-            "db_path": DB_PATH,
-            "github_owner": st.session_state.get("github_owner", ""),
-            "github_repo": st.session_state.get("github_repo", ""),
-            "github_token": st.session_state.get("github_token", "")
-        }
-
-        st.session_state.agent = DataAgent(
-            api_key=api_key,
-            model="gpt-4o-mini",
-            config=config
-        )
-        logger.info("Agent initialized")
+    api_key = os.environ.get("OPENAI_API_KEY", "")
+    if not api_key:
+        st.error("Please set the OPENAI_API_KEY environment variable.")
+        st.stop()
 
-    return st.session_state.agent
+    # Credentials are passed on every request and never written to the session store
+    config = {
+        "db_path": DB_PATH,
+        "github_owner": st.session_state.get("github_owner", ""),
+        "github_repo": st.session_state.get("github_repo", ""),
+        "github_token": st.session_state.get("github_token", "")
+    }
+
+    return session_store.get(get_session_id(), api_key, model="gpt-4o-mini", config=config)
 
 
 def render_chat():
@@ -223,6 +223,8 @@ You can also ask me to create a support ticket if you need human assistance!"""
             "role": "assistant",
             "content": welcome_msg
         })
+        if os.environ.get("OPENAI_API_KEY"):
+            st.session_state.messages.extend(initialize_agent().transcript)
 
     if "sample_query" in st.session_state:
         query = st.session_state.sample_query
@@ -240,19 +242,44 @@ You can also ask me to create a support ticket if you need human assistance!"""
         with st.chat_message("user"):
             st.markdown(prompt)
 
-        agent = initialize_agent()
+        # Held for the whole turn so another tab on the same URL waits instead of interleaving
+        with session_store.lock(get_session_id()):
+            agent = initialize_agent()
 
-        with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
+            with st.chat_message("assistant"):
+                status = None
+                placeholder = st.empty()
+                response = ""
                 try:
-                    response = agent.chat_sync(prompt)
-                    st.markdown(response)
+                    for event in agent.chat_events(prompt):
+                        if event["type"] == "text":
+                            response += event["content"]
+                            placeholder.markdown(response + "▌")
+                        elif event["type"] == "tool_start":
+                            if status is None:
+                                status = st.status(event["message"], expanded=False)
+                            status.update(label=event["message"], state="running")
+                            if event["name"] == "query_database":
+                                status.code(event["arguments"].get("query", ""), language="sql")
+                        elif event["type"] == "tool_end" and status is not None:
+                            if event["success"]:
+                                rows = f" ({event['row_count']} rows)" if event["row_count"] is not None else ""
+                                status.write(f"✓ {event['name']}{rows}")
+                            else:
+                                status.write(f"✗ {event['name']}: {event['error']}")
+
+                    if status is not None:
+                        status.update(label="Done", state="complete")
+                    placeholder.markdown(response)
                     st.session_state.messages.append({
                         "role": "assistant",
                         "content": response
                     })
+                    session_store.save(agent)
                     logger.info(f"Agent response generated")
                 except Exception as e:
+                    if status is not None:
+                        status.update(state="error")
                     error_msg = f"An error occurred: {str(e)}"
                     st.error(error_msg)
                     logger.error(error_msg)
@@ -261,8 +288,11 @@ You can also ask me to create a support ticket if you need human assistance!"""
     with col1:
         if st.button("🔄 Reset Chat"):
             st.session_state.messages = []
-            if "agent" in st.session_state:
-                st.session_state.agent.reset_conversation()
+            if os.environ.get("OPENAI_API_KEY"):
+                with session_store.lock(get_session_id()):
+                    agent = initialize_agent()
+                    agent.reset_conversation()
+                    session_store.save(agent)
             logger.info("Chat reset by user")
             st.rerun()
 
@@ -282,16 +312,27 @@ def render_schema_explorer():
         schema = schema_result["schema"]
 
         for table_name, table_info in schema.items():
-            with st.expander(f"**{table_name}** ({table_info['row_count']:,} rows)", expanded=True):
+            approx = "" if table_info["row_count_exact"] else "~"
+            with st.expander(f"**{table_name}** ({approx}{table_info['row_count']:,} rows)", expanded=True):
                 columns_df = pd.DataFrame(table_info["columns"])
                 st.dataframe(columns_df, use_container_width=True, hide_index=True)
 
-                conn = get_db_connection()
-                sample_df = pd.read_sql_query(
-                    f"SELECT * FROM {table_name} LIMIT 5",
-                    conn
-                )
-                conn.close()
+                if table_info["foreign_keys"]:
+                    st.markdown("**Foreign Keys:** " + ", ".join(
+                        f"`{fk['column']}` → `{fk['references_table']}.{fk['references_column']}`"
+                        for fk in table_info["foreign_keys"]
+                    ))
+                if table_info["indexes"]:
+                    st.markdown("**Indexes:** " + ", ".join(
+                        f"`{index['name']}` ({', '.join(index['columns'])})"
+                        for index in table_info["indexes"]
+                    ))
+
+                with get_db_connection() as conn:
+                    sample_df = pd.read_sql_query(
+                        f"SELECT * FROM {table_name} LIMIT 5",
+                        conn
+                    )
 
                 st.markdown("**Sample Data:**")
                 st.dataframe(sample_df, use_container_width=True, hide_index=True)
@@ -299,12 +340,81 @@ def render_schema_explorer():
         st.error(f"Error loading schema: {schema_result.get('error', 'Unknown error')}")
 
 
+def render_performance():
+    st.header("⏱ Performance")
+
+    # Kept in memory by the tracer, so reruns do not re-read the trace file
+    records = list(tracer.recent)
+    if not records:
+        st.info(f"No traces yet. Each chat turn is written to {TRACE_PATH}.")
+        return
+
+    turns = pd.DataFrame([summarize_turn(record) for record in records])
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Turns", f"{len(turns):,}")
+    with col2:
+        st.metric("Median Turn", f"{turns['duration_ms'].median() / 1000:.1f}s")
+    with col3:
+        st.metric("p95 Turn", f"{turns['duration_ms'].quantile(0.95) / 1000:.1f}s")
+    with col4:
+        queries = turns["queries"].sum()
+        st.metric("Query Cache Hits", f"{turns['cache_hits'].sum() / queries:.0%}" if queries else "-")
+
+    st.subheader("Where the time goes")
+    breakdown = turns.tail(50).melt(
+        id_vars=["trace_id", "time", "question"],
+        value_vars=["llm_ms", "tools_ms", "serialize_ms", "prompt_ms"],
+        var_name="part",
+        value_name="ms"
+    )
+    fig = px.bar(breakdown, x="trace_id", y="ms", color="part", hover_data=["time", "question"], height=300)
+    fig.update_layout(margin=dict(l=0, r=0, t=10, b=0), yaxis_title="ms")
+    fig.update_xaxes(title_text="Last 50 turns", showticklabels=False)
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.subheader("Recent turns")
+    st.dataframe(
+        turns.iloc[::-1][[
+            "time", "question", "duration_ms", "llm_ms", "tools_ms", "serialize_ms", "llm_calls", "ttft_ms",
+            "queries", "rows", "cache_hits", "template", "prompt_tokens", "completion_tokens", "budget_exceeded"
+        ]],
+        use_container_width=True,
+        hide_index=True
+    )
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("Slowest queries")
+        query_spans = pd.DataFrame([
+            {"query": span.get("query"), "ms": span["duration_ms"], "rows": span.get("rows"),
+             "cached": span.get("cached"), "engine": span.get("engine"), "error": span.get("error")}
+            for record in records for span in record.get("spans", [])
+            if span["name"] == "tool" and span.get("tool") == "query_database"
+        ])
+        if query_spans.empty:
+            st.caption("No queries traced yet.")
+        else:
+            st.dataframe(query_spans.sort_values("ms", ascending=False).head(10), use_container_width=True, hide_index=True)
+    with col2:
+        st.subheader("Most expensive conversations")
+        sessions = turns.groupby("session_id").agg(
+            turns=("trace_id", "count"),
+            prompt_tokens=("prompt_tokens", "sum"),
+            completion_tokens=("completion_tokens", "sum"),
+            total_s=("duration_ms", lambda ms: round(ms.sum() / 1000, 1))
+        ).reset_index()
+        sessions["tokens"] = sessions["prompt_tokens"] + sessions["completion_tokens"]
+        st.dataframe(sessions.sort_values("tokens", ascending=False).head(10), use_container_width=True, hide_index=True)
+
+
 def main():
     logger.info("Application started")
 
     render_sidebar()
 
-    tab1, tab2 = st.tabs(["💬 Chat", "📋 Schema Explorer"])
+    tab1, tab2, tab3 = st.tabs(["💬 Chat", "📋 Schema Explorer", "⏱ Performance"])
 
     with tab1:
         render_chat()
@@ -312,6 +422,9 @@ def main():
     with tab2:
         render_schema_explorer()
 
+    with tab3:
+        render_performance()
+
     st.divider()
     st.markdown(
         """
@@ -1,9 +1,20 @@
+import os
 import json
+import time
+import uuid
 import logging
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Generator, Optional
-from openai import OpenAI
+from openai import OpenAI, APITimeoutError
 
 from src.tools import TOOL_DEFINITIONS, execute_tool, get_database_schema
+from src.schema_cache import schema_cache
+from src.history_manager import HistoryManager, HISTORY_MAX_TOKENS, HISTORY_KEEP_TURNS
+from src.result_format import encode_result, summarize_result
+from src.template_cache import template_cache
+from src.tracing import tracer
 
 logging.basicConfig(
     level=logging.INFO,
@@ -19,17 +30,15 @@ SYSTEM_PROMPT = """You are a helpful data assistant for an e-commerce business.
 2. **Explain Schema**: You can show and explain the database structure.
 3. **Create Support Tickets**: You can escalate issues to human support by creating GitHub issues.
 
-## Database Overview:
-The database contains the following tables:
-- **customers**: Customer information (id, name, email, phone, city, state)
-- **products**: Product catalog (id, name, category, price, cost, stock)
-- **orders**: Order records (id, customer_id, date, status, payment, total)
-- **order_items**: Order line items (id, order_id, product_id, quantity, price)
+## Database Schema:
+Tables with columns, types, primary keys (PK), foreign keys (->), example date formats and the values seen in low-cardinality columns ({...}):
+{schema_digest}
 
 ## Safety Guidelines:
 - You can ONLY execute SELECT queries (read-only)
 - DELETE, UPDATE, INSERT, DROP and other modifying operations are blocked
 - If a user asks for data modifications, explain that you can only read data
+- If a query is stopped by a guard (timeout, work budget, or full scan), follow the returned hint and rewrite it with tighter filters
 
 ## When to Create Support Tickets:
 - When the user explicitly asks to speak with a human or create a ticket
@@ -42,113 +51,485 @@ The database contains the following tables:
 - Format query results in readable tables when appropriate
 - Explain what the data means in business terms
 - Suggest follow-up queries when relevant
-- If you're unsure, use get_database_schema to understand the structure first
+- The schema above is current; write SQL directly from it and only call get_database_schema when you need row counts
 
 Remember: Always use the tools available to you to help the user. Don't make up data - always query the database."""
 
 
+MAX_PARALLEL_TOOL_CALLS = int(os.environ.get("MAX_PARALLEL_TOOL_CALLS", "8"))
+
+# Shared by all sessions; sized to match the read-only connection pool
+TOOL_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_PARALLEL_TOOL_CALLS, thread_name_prefix="tool")
+
+SCHEMA_UNAVAILABLE = "(schema unavailable - call get_database_schema before writing SQL)"
+
+
+def build_system_prompt(schema_digest: Optional[str]) -> str:
+    return SYSTEM_PROMPT.replace("{schema_digest}", schema_digest or SCHEMA_UNAVAILABLE)
+
+
+MAX_TOOL_ROUNDS = int(os.environ.get("MAX_TOOL_ROUNDS", "6"))
+TURN_TIMEOUT_SECONDS = float(os.environ.get("TURN_TIMEOUT_SECONDS", "60"))
+TURN_MAX_TOKENS = int(os.environ.get("TURN_MAX_TOKENS", "50000"))
+
+BUDGET_FINAL_NOTE = (
+    "The tool budget for this question is used up ({reason}). Do not call any more tools. "
+    "Answer from the results above and briefly say what could not be checked."
+)
+TIMEOUT_MESSAGE = (
+    "I ran out of time before finishing this question. "
+    "Try narrowing it down, for example to a shorter date range or a single category."
+)
+
+
+class TurnBudget:
+
+    def __init__(self, max_rounds: int, max_seconds: float, max_tokens: int):
+        self.max_rounds = max_rounds
+        self.max_seconds = max_seconds
+        self.max_tokens = max_tokens
+        self.started = time.perf_counter()
+        self.rounds = 0
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.estimated = False
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def remaining_seconds(self) -> float:
+        return self.max_seconds - self.elapsed()
+
+    def record(self, prompt_tokens: int, completion_tokens: int, estimated: bool) -> None:
+        self.llm_calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.estimated = self.estimated or estimated
+
+    def exceeded(self) -> Optional[str]:
+        if self.rounds >= self.max_rounds:
+            return f"{self.rounds} tool rounds"
+        if self.prompt_tokens + self.completion_tokens >= self.max_tokens:
+            return f"{self.prompt_tokens + self.completion_tokens} tokens"
+        if self.remaining_seconds() <= 0:
+            return f"{self.elapsed():.0f}s"
+        return None
+
+    def summary(self) -> dict:
+        return {
+            "rounds": self.rounds,
+            "llm_calls": self.llm_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+            "estimated": self.estimated,
+            "elapsed_ms": self.elapsed() * 1000
+        }
+
+
+_shared_clients = {}
+_shared_clients_lock = threading.Lock()
+
+
+def shared_client(client_class, api_key: str):
+    # One client (and so one HTTP connection pool) per API key, reused by every session
+    key = (client_class, api_key)
+    with _shared_clients_lock:
+        client = _shared_clients.get(key)
+        if client is None:
+            client = client_class(api_key=api_key)
+            _shared_clients[key] = client
+        return client
+
+
+TOOL_STATUS_MESSAGES = {
+    "query_database": "Running query...",
+    "get_database_schema": "Reading database schema...",
+    "create_support_ticket": "Creating support ticket..."
+}
+
+
 class DataAgent:
 
+    client_class = OpenAI
+
     def __init__(
         self,
         api_key: str,
         model: str = "gpt-4o-mini",
-        config: Optional[dict] = None
+        config: Optional[dict] = None,
+        client=None
     ):
-        self.client = OpenAI(api_key=api_key)
+        self.client = client or self.client_class(api_key=api_key)
+        self._owns_client = client is None
         self.model = model
         self.config = config or {}
         self.conversation_history = []
+        self.transcript = []
+        self.history = HistoryManager(
+            max_tokens=self.config.get("history_max_tokens", HISTORY_MAX_TOKENS),
+            keep_turns=self.config.get("history_keep_turns", HISTORY_KEEP_TURNS),
+            model=model
+        )
+
+        self._schema_version = None
+        self._system_message = None
+        self._turn_queries = []
+        self._trace = None
+        self.session_id = self.config.get("session_id") or uuid.uuid4().hex[:12]
+        self.last_turn_usage = None
+        self.usage = {"turns": 0, "llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
 
         logger.info(f"Agent initialized with model: {model}")
 
-        self.conversation_history.append({
-            "role": "system",
-            "content": SYSTEM_PROMPT
+        self.conversation_history.append(self._current_system_message())
+
+    def _current_system_message(self) -> dict:
+        # The system prompt only changes with the schema, so the prompt prefix stays
+        # byte-identical across requests and benefits from provider prompt caching
+        try:
+            schema_version, digest = schema_cache.get_digest(self.config.get("db_path", "data/ecommerce.db"))
+        except Exception as e:
+            logger.warning(f"Could not build schema digest: {str(e)}")
+            schema_version, digest = None, None
+
+        if self._system_message is None or schema_version != self._schema_version:
+            self._schema_version = schema_version
+            template_cache.learn_schema_digest(digest)
+            self._system_message = {
+                "role": "system",
+                "content": build_system_prompt(digest)
+            }
+        return self._system_message
+
+    def _span(self, name: str, **attributes):
+        return self._trace.span(name, **attributes) if self._trace else nullcontext({})
+
+    def _trace_tool(self, span: dict, function_name: str, arguments: dict, result: dict) -> None:
+        span.update({
+            "tool": function_name,
+            "success": result.get("success", False),
+            "rows": result.get("row_count"),
+            "cached": bool(result.get("cached")),
+            "engine": result.get("engine"),
+            "error": result.get("error")
         })
+        if function_name == "query_database":
+            span["query"] = arguments.get("query")
 
     def reset_conversation(self):
-        self.conversation_history = [{
-            "role": "system",
-            "content": SYSTEM_PROMPT
-        }]
+        self.conversation_history = [self._current_system_message()]
+        self.transcript = []
         logger.info("Conversation history reset")
 
-    def _process_tool_calls(self, tool_calls: list) -> list[dict]:
-        results = []
-
+    def to_state(self) -> dict:
+        # Old tool results are already elided by compaction; the system prompt is rebuilt on load
+        self.conversation_history = self.history.compact(self.conversation_history)
+        return {
+            "session_id": self.session_id,
+            "model": self.model,
+            "history": self.conversation_history[1:],
+            "transcript": self.transcript,
+            "usage": self.usage
+        }
+
+    @classmethod
+    def from_state(cls, state: dict, api_key: str, config: Optional[dict] = None, client=None) -> "DataAgent":
+        agent = cls(
+            api_key=api_key,
+            model=state.get("model", "gpt-4o-mini"),
+            config={**(config or {}), "session_id": state["session_id"]},
+            client=client
+        )
+        agent.conversation_history.extend(state.get("history", []))
+        agent.transcript = state.get("transcript", [])
+        agent.usage.update(state.get("usage") or {})
+        return agent
+
+    def _run_tool(self, function_name: str, arguments: dict) -> tuple[dict, float]:
+        start_time = time.perf_counter()
+        with self._span("tool") as span:
+            try:
+                result = execute_tool(function_name, arguments, self.config)
+            except Exception as e:
+                logger.error(f"Tool {function_name} failed: {str(e)}")
+                result = {"success": False, "error": f"Tool error: {str(e)}"}
+            self._trace_tool(span, function_name, arguments, result)
+        return result, (time.perf_counter() - start_time) * 1000
+
+    def _parse_tool_calls(self, tool_calls: list[dict]) -> list[tuple]:
+        calls = []
         for tool_call in tool_calls:
-            function_name = tool_call.function.name
-            arguments = json.loads(tool_call.function.arguments)
+            try:
+                arguments = json.loads(tool_call["function"]["arguments"] or "{}")
+            except json.JSONDecodeError:
+                arguments = {}
+            calls.append((tool_call, tool_call["function"]["name"], arguments))
 
+        for _, function_name, arguments in calls:
             logger.info(f"Processing tool call: {function_name}")
-            logger.info(f"Arguments: {json.dumps(arguments, indent=2)}")
-
-            result = execute_tool(function_name, arguments, self.config)
-
-            logger.info(f"Tool result: {json.dumps(result, indent=2)[:500]}...")
+            logger.info(f"Arguments: {arguments}")
+        return calls
+
+    def _tool_start_event(self, index: int, function_name: str, arguments: dict) -> dict:
+        return {
+            "type": "tool_start",
+            "index": index,
+            "name": function_name,
+            "arguments": arguments,
+            "message": TOOL_STATUS_MESSAGES.get(function_name, f"Running {function_name}...")
+        }
+
+    def _tool_end_event(self, index: int, function_name: str, arguments: dict, result: dict, elapsed_ms: float) -> dict:
+        logger.info(f"Tool {function_name} finished in {elapsed_ms:.1f} ms: {summarize_result(result)}")
+
+        if function_name == "query_database":
+            self._turn_queries.append({
+                "query": arguments.get("query"),
+                "success": result.get("success", False),
+                "row_count": result.get("row_count") or 0
+            })
 
-            results.append({
-                "tool_call_id": tool_call.id,
+        return {
+            "type": "tool_end",
+            "index": index,
+            "name": function_name,
+            "success": result.get("success", False),
+            "row_count": result.get("row_count"),
+            "error": result.get("error"),
+            "elapsed_ms": elapsed_ms
+        }
+
+    def _tool_messages(self, calls: list[tuple], outcomes: list[dict]) -> list[dict]:
+        messages = []
+        for (tool_call, function_name, _), result in zip(calls, outcomes):
+            with self._span("serialize", tool=function_name) as span:
+                content = encode_result(result)
+                span["chars"] = len(content)
+            messages.append({
+                "tool_call_id": tool_call["id"],
                 "role": "tool",
-                "content": json.dumps(result)
+                "content": content
             })
+        return messages
+
+    def _process_tool_calls(self, tool_calls: list[dict]) -> Generator[dict, None, list[dict]]:
+        calls = self._parse_tool_calls(tool_calls)
+        for index, (_, function_name, arguments) in enumerate(calls):
+            yield self._tool_start_event(index, function_name, arguments)
+
+        start_time = time.perf_counter()
+        outcomes = [None] * len(calls)
+
+        if len(calls) == 1:
+            finished = [(0, self._run_tool(calls[0][1], calls[0][2]))]
+        else:
+            # Tools are independent reads (each on its own pooled connection) or HTTP calls,
+            # so a turn takes as long as its slowest call rather than the sum
+            futures = {
+                TOOL_EXECUTOR.submit(self._run_tool, function_name, arguments): index
+                for index, (_, function_name, arguments) in enumerate(calls)
+            }
+            finished = ((futures[future], future.result()) for future in as_completed(futures))
+
+        for index, (result, elapsed_ms) in finished:
+            outcomes[index] = result
+            yield self._tool_end_event(index, calls[index][1], calls[index][2], result, elapsed_ms)
+
+        if len(calls) > 1:
+            logger.info(f"{len(calls)} tool calls completed in {(time.perf_counter() - start_time) * 1000:.1f} ms")
+
+        return self._tool_messages(calls, outcomes)
+
+    def _new_budget(self) -> TurnBudget:
+        return TurnBudget(
+            max_rounds=self.config.get("max_tool_rounds", MAX_TOOL_ROUNDS),
+            max_seconds=self.config.get("turn_timeout", TURN_TIMEOUT_SECONDS),
+            max_tokens=self.config.get("turn_max_tokens", TURN_MAX_TOKENS)
+        )
 
-        return results
-
-    def chat(self, user_message: str) -> Generator[str, None, None]:
+    def _completion_request(self, budget: TurnBudget, final_note: Optional[str] = None) -> dict:
+        # Every request resends the history, so keep it inside the token budget first
+        with self._span("history_compact") as span:
+            self.conversation_history = self.history.compact(self.conversation_history)
+            span["messages"] = len(self.conversation_history)
+            span["tokens"] = self.history.count(self.conversation_history)
+        logger.info(f"Prompt history: {span['messages']} messages, ~{span['tokens']} tokens")
+
+        messages = self.conversation_history
+        if final_note:
+            # Only sent with this request; the note is not kept in the history
+            messages = messages + [{"role": "system", "content": final_note}]
+
+        return {
+            "model": self.model,
+            "messages": messages,
+            "tools": TOOL_DEFINITIONS,
+            "tool_choice": "none" if final_note else "auto",
+            "stream": True,
+            "stream_options": {"include_usage": True},
+            # A single slow response cannot push the turn past its deadline
+            "timeout": max(1.0, budget.remaining_seconds())
+        }
+
+    def _accumulate_chunk(self, chunk, state: dict) -> Optional[str]:
+        state.setdefault("first_chunk_at", time.perf_counter())
+        if getattr(chunk, "usage", None):
+            # With include_usage the last chunk has no choices and carries the token counts
+            state["usage"] = chunk.usage
+        if not chunk.choices:
+            return None
+        delta = chunk.choices[0].delta
+
+        if delta.content:
+            state["content_parts"].append(delta.content)
+
+        # Tool calls arrive as fragments keyed by index; the arguments JSON is split across chunks
+        for tool_delta in delta.tool_calls or []:
+            call = state["tool_calls"].setdefault(tool_delta.index, {
+                "id": "",
+                "type": "function",
+                "function": {"name": "", "arguments": ""}
+            })
+            if tool_delta.id:
+                call["id"] = tool_delta.id
+            if tool_delta.function:
+                if tool_delta.function.name:
+                    call["function"]["name"] += tool_delta.function.name
+                if tool_delta.function.arguments:
+                    call["function"]["arguments"] += tool_delta.function.arguments
+
+        return delta.content
+
+    def _assistant_message(self, state: dict, request: dict, budget: TurnBudget, timed_out: bool = False) -> dict:
+        message = {
+            "content": "".join(state["content_parts"]) or None,
+            "tool_calls": [] if timed_out else [state["tool_calls"][index] for index in sorted(state["tool_calls"])],
+            "timed_out": timed_out
+        }
+
+        usage = state["usage"]
+        if usage is not None:
+            usage = {"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens, "estimated": False}
+        else:
+            # Providers without stream usage: count locally so the token budget still applies
+            usage = {
+                "prompt_tokens": self.history.count(request["messages"]),
+                "completion_tokens": self.history.count_message({**message, "role": "assistant"}),
+                "estimated": True
+            }
+        budget.record(usage["prompt_tokens"], usage["completion_tokens"], estimated=usage["estimated"])
+        message["usage"] = usage
+        return message
+
+    def _trace_llm_call(self, span: dict, state: dict, message: dict) -> None:
+        if "first_chunk_at" in state:
+            span["ttft_ms"] = round((state["first_chunk_at"] - state["started_at"]) * 1000, 3)
+        span.update(message["usage"])
+        span["tool_calls"] = len(message["tool_calls"])
+        span["timed_out"] = message["timed_out"]
+
+    def _new_stream_state(self) -> dict:
+        return {"content_parts": [], "tool_calls": {}, "usage": None, "started_at": time.perf_counter()}
+
+    def _stream_completion(self, budget: TurnBudget, final_note: Optional[str] = None) -> Generator[dict, None, dict]:
+        request = self._completion_request(budget, final_note)
+
+        with self._span("llm_call", round=budget.rounds, final=bool(final_note)) as span:
+            state = self._new_stream_state()
+            try:
+                stream = self.client.chat.completions.create(**request)
+                for chunk in stream:
+                    text = self._accumulate_chunk(chunk, state)
+                    if text:
+                        yield {"type": "text", "content": text}
+            except APITimeoutError:
+                logger.warning(f"Model call timed out after {budget.elapsed():.1f}s of the turn")
+                message = self._assistant_message(state, request, budget, timed_out=True)
+            else:
+                message = self._assistant_message(state, request, budget)
+            self._trace_llm_call(span, state, message)
+
+        return message
+
+    def _over_budget(self, budget: TurnBudget, reason: str) -> Optional[str]:
+        # Returns the note for a final tool-free answer, or None when there is no time left for one
+        logger.warning(f"Turn budget exceeded ({reason}); finishing without further tools")
+        if self._trace:
+            self._trace.set(budget_exceeded=reason)
+        if budget.remaining_seconds() <= 0:
+            return None
+        return BUDGET_FINAL_NOTE.format(reason=reason)
+
+    def _start_turn(self, user_message: str) -> Optional[dict]:
+        # Appends the user message and returns the tool call for a directly executable SQL template, if any
         logger.info(f"User message: {user_message}")
 
+        self._turn_queries = []
+        self._trace = tracer.start_turn(self.session_id, user_message) if self.config.get("tracing", True) else None
+
+        with self._span("system_prompt"):
+            self.conversation_history[0] = self._current_system_message()
+
+        template = None
+        if self.config.get("template_cache", True):
+            with self._span("template_lookup") as span:
+                template = template_cache.match(self.config.get("db_path", "data/ecommerce.db"), user_message)
+                if template:
+                    span["similarity"] = round(template["similarity"], 3)
+                    span["executable"] = template["executable"]
+            if template and self._trace:
+                self._trace.set(template="executed" if template["executable"] else "hinted")
+
+        content = user_message
+        if template and not template["executable"]:
+            content += (
+                f"\n\n(A similar earlier question, \"{template['template_question']}\", was answered with: "
+                f"{template['sql']} - adapt it if it fits.)"
+            )
         self.conversation_history.append({
             "role": "user",
-            "content": user_message
+            "content": content
         })
 
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=self.conversation_history,
-            tools=TOOL_DEFINITIONS,
-            tool_choice="auto",
-            stream=False
-        )
-
-        assistant_message = response.choices[0].message
-
-        while assistant_message.tool_calls:
-            logger.info(f"Tool calls detected: {len(assistant_message.tool_calls)}")
-
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": assistant_message.content,
-                "tool_calls": [
-                    {
-                        "id": tc.id,
-                        "type": "function",
-                        "function": {
-                            "name": tc.function.name,
-                            "arguments": tc.function.arguments
-                        }
-                    }
-                    for tc in assistant_message.tool_calls
-                ]
-            })
+        if not (template and template["executable"]):
+            return None
+        # Runs the cached SQL as if the model had called query_database itself,
+        # which saves the round trip where the model writes the SQL
+        return {
+            "id": f"template_{int(time.time() * 1000)}",
+            "type": "function",
+            "function": {"name": "query_database", "arguments": json.dumps({"query": template["sql"]})}
+        }
+
+    def _finish_template(self, tool_call: dict, tool_results: list[dict]) -> bool:
+        if not self._turn_queries or not self._turn_queries[-1]["success"]:
+            logger.info("Template query failed, falling back to the model")
+            template_cache.record_failure()
+            self._turn_queries.clear()
+            return False
 
-            tool_results = self._process_tool_calls(assistant_message.tool_calls)
-
-            for result in tool_results:
-                self.conversation_history.append(result)
-
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=self.conversation_history,
-                tools=TOOL_DEFINITIONS,
-                tool_choice="auto",
-                stream=False
-            )
+        self.conversation_history.append({
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [tool_call]
+        })
+        self.conversation_history.extend(tool_results)
+        return True
 
-            assistant_message = response.choices[0].message
+    def _add_tool_round(self, assistant_message: dict) -> None:
+        logger.info(f"Tool calls detected: {len(assistant_message['tool_calls'])}")
+        self.conversation_history.append({
+            "role": "assistant",
+            "content": assistant_message["content"],
+            "tool_calls": assistant_message["tool_calls"]
+        })
 
-        final_content = assistant_message.content or ""
+    def _end_turn(self, user_message: str, assistant_message: dict, template_used: bool, budget: TurnBudget) -> None:
+        final_content = assistant_message["content"] or ""
+        if assistant_message.get("timed_out"):
+            final_content = (final_content + "\n\n" + TIMEOUT_MESSAGE).strip()
 
         self.conversation_history.append({
             "role": "assistant",
@@ -157,7 +538,76 @@ class DataAgent:
 
         logger.info(f"Final response length: {len(final_content)} chars")
 
-        yield final_content
+        self.transcript.append({"role": "user", "content": user_message})
+        self.transcript.append({"role": "assistant", "content": final_content})
+
+        self.last_turn_usage = budget.summary()
+        self.usage["turns"] += 1
+        for key in ("llm_calls", "prompt_tokens", "completion_tokens"):
+            self.usage[key] += self.last_turn_usage[key]
+        logger.info(
+            f"Turn used {budget.rounds} tool rounds, {budget.llm_calls} model calls, "
+            f"{budget.prompt_tokens} prompt + {budget.completion_tokens} completion tokens"
+            f"{' (estimated)' if budget.estimated else ''} in {budget.elapsed():.1f}s"
+        )
+
+        # The last successful query is the one the answer rests on
+        answered = [q for q in self._turn_queries if q["success"] and q["row_count"] and q["query"]]
+        if self.config.get("template_cache", True) and answered and not (template_used and len(self._turn_queries) == 1):
+            template_cache.store(self.config.get("db_path", "data/ecommerce.db"), user_message, answered[-1]["query"])
+
+        if self._trace:
+            if not template_used and self._trace.attributes.get("template") == "executed":
+                self._trace.set(template="failed")
+            self._trace.set(usage=self.last_turn_usage, timed_out=bool(assistant_message.get("timed_out")))
+            self._trace.finish()
+            self._trace = None
+
+    def chat_events(self, user_message: str) -> Generator[dict, None, None]:
+        budget = self._new_budget()
+        template_call = self._start_turn(user_message)
+
+        template_used = False
+        if template_call:
+            tool_results = yield from self._process_tool_calls([template_call])
+            template_used = self._finish_template(template_call, tool_results)
+
+        assistant_message = yield from self._stream_completion(budget)
+
+        while assistant_message["tool_calls"]:
+            if assistant_message["content"]:
+                # Keep text streamed before the tool calls apart from what follows
+                yield {"type": "text", "content": "\n\n"}
+
+            reason = budget.exceeded()
+            if reason:
+                final_note = self._over_budget(budget, reason)
+                if final_note is None:
+                    assistant_message = {"content": assistant_message["content"], "tool_calls": [], "timed_out": True}
+                else:
+                    assistant_message = yield from self._stream_completion(budget, final_note)
+                    assistant_message["tool_calls"] = []
+                break
+
+            budget.rounds += 1
+            self._add_tool_round(assistant_message)
+
+            tool_results = yield from self._process_tool_calls(assistant_message["tool_calls"])
+
+            for result in tool_results:
+                self.conversation_history.append(result)
+
+            assistant_message = yield from self._stream_completion(budget)
+
+        if assistant_message.get("timed_out"):
+            yield {"type": "text", "content": ("\n\n" if assistant_message["content"] else "") + TIMEOUT_MESSAGE}
+
+        self._end_turn(user_message, assistant_message, template_used, budget)
+
+    def chat(self, user_message: str) -> Generator[str, None, None]:
+        for event in self.chat_events(user_message):
+            if event["type"] == "text":
+                yield event["content"]
 
     def chat_sync(self, user_message: str) -> str:
         response_parts = list(self.chat(user_message))
@@ -0,0 +1,375 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Optional
+
+import pandas as pd
+
+from src.result_cache import data_version
+from src.sql_validator import tokenize
+from src.schema_cache import schema_cache
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("ChatWithData.Analytics")
+
+ANALYTICS_ENGINE = os.environ.get("ANALYTICS_ENGINE", "auto").lower()
+ANALYTICS_MIN_ROWS = int(os.environ.get("ANALYTICS_MIN_ROWS", "100000"))
+ANALYTICS_SNAPSHOT_DIR = os.environ.get(
+    "ANALYTICS_SNAPSHOT_DIR", os.path.join(tempfile.gettempdir(), "chat_with_data_analytics")
+)
+SNAPSHOT_BATCH_ROWS = 50_000
+
+CLAUSE_KEYWORDS = {
+    "WHERE", "GROUP", "ORDER", "HAVING", "LIMIT", "JOIN", "INNER", "LEFT", "RIGHT", "FULL", "CROSS",
+    "NATURAL", "ON", "USING", "UNION", "EXCEPT", "INTERSECT", "WINDOW", "OFFSET"
+}
+
+AGGREGATE_FUNCTIONS = {"count", "sum", "avg", "min", "max", "total", "group_concat"}
+
+# Snapshots only ever read their own tables: no files, URLs, extensions or ATTACH, and queries
+# cannot SET these back. integer_division and the NULL order match SQLite's semantics.
+SNAPSHOT_CONFIG = {
+    "enable_external_access": False,
+    "integer_division": True,
+    "default_null_order": "nulls_first_on_asc_last_on_desc",
+    "lock_configuration": True
+}
+
+# Functions whose results differ between the engines: DuckDB's CAST rounds reals to integers where
+# SQLite truncates, and its round() returns DECIMAL instead of REAL. Queries using them stay on SQLite.
+SQLITE_ONLY_FUNCTIONS = {"cast", "round"}
+
+DUCKDB_TYPES = {
+    "INTEGER": ("BIGINT", "Int64"),
+    "REAL": ("DOUBLE", "Float64"),
+}
+
+
+class UnsupportedQuery(Exception):
+    pass
+
+
+def _column_type(declared: str) -> tuple[str, str]:
+    # Same affinity rules SQLite applies to declared column types
+    declared = (declared or "").upper()
+    if "INT" in declared:
+        return DUCKDB_TYPES["INTEGER"]
+    if any(name in declared for name in ("REAL", "FLOA", "DOUB")):
+        return DUCKDB_TYPES["REAL"]
+    return ("VARCHAR", "object")
+
+
+def _tokens(query: str) -> list:
+    # (kind, text, start, end) for every token outside comments; keywords, names, numbers and
+    # symbols are all "word", since callers only need to tell them apart from quoted text
+    kinds = {"string": "literal", "identifier": "identifier"}
+    return [(kinds.get(token.kind, "word"), token.text, token.start, token.end) for token in tokenize(query)]
+
+
+def referenced_tables(query: str) -> list[str]:
+    # Every FROM/JOIN target, including comma-separated ones; table functions are returned
+    # with a trailing "(" so callers can tell them apart from tables
+    tokens = _tokens(query)
+    tables = []
+    for i, (kind, text, _, _) in enumerate(tokens):
+        if kind != "word" or text.upper() not in ("FROM", "JOIN"):
+            continue
+        j = i + 1
+        while j < len(tokens) and tokens[j][1] != "(":
+            name = tokens[j][1].strip('"`[]')
+            if j + 1 < len(tokens) and tokens[j + 1][1] == "(":
+                tables.append(name + "(")
+                break
+            tables.append(name)
+            j += 1
+            if j < len(tokens) and tokens[j][1].upper() == "AS":
+                j += 1
+            if j < len(tokens) and tokens[j][0] != "literal" and tokens[j][1] not in (",", ")", ";") \
+                    and tokens[j][1].upper() not in CLAUSE_KEYWORDS:
+                j += 1
+            if j < len(tokens) and tokens[j][1] == ",":
+                j += 1
+                continue
+            break
+    return tables
+
+
+def has_top_level_order_by(query: str) -> bool:
+    depth = 0
+    tokens = _tokens(query)
+    for i, (kind, text, _, _) in enumerate(tokens[:-1]):
+        if text == "(":
+            depth += 1
+        elif text == ")":
+            depth -= 1
+        elif depth == 0 and kind == "word" and text.upper() == "ORDER" and tokens[i + 1][1].upper() == "BY":
+            return True
+    return False
+
+
+def is_analytical_query(query: str) -> bool:
+    tokens = _tokens(query)
+    for i, (kind, text, _, _) in enumerate(tokens):
+        if kind != "word":
+            continue
+        word = text.lower()
+        if word == "group" and i + 1 < len(tokens) and tokens[i + 1][1].lower() == "by":
+            return True
+        if word in AGGREGATE_FUNCTIONS and i + 1 < len(tokens) and tokens[i + 1][1] == "(":
+            return True
+    return False
+
+
+def translate_query(query: str) -> str:
+    # Rewrites the SQLite-isms the agent commonly uses; anything else DuckDB rejects falls back to SQLite
+    tokens = _tokens(query)
+    replacements = []
+
+    i = 0
+    while i < len(tokens):
+        kind, text, start, end = tokens[i]
+        word = text.lower() if kind == "word" else None
+
+        if word == "like":
+            # SQLite LIKE is case-insensitive for ASCII, DuckDB LIKE is not
+            replacements.append((start, end, "ILIKE"))
+
+        elif word == "strftime" and i + 1 < len(tokens) and tokens[i + 1][1] == "(":
+            depth, args, arg_start = 0, [], i + 2
+            j = i + 1
+            while j < len(tokens):
+                if tokens[j][1] == "(":
+                    depth += 1
+                elif tokens[j][1] == ")":
+                    depth -= 1
+                    if depth == 0:
+                        args.append((arg_start, j))
+                        break
+                elif tokens[j][1] == "," and depth == 1:
+                    args.append((arg_start, j))
+                    arg_start = j + 1
+                j += 1
+
+            if len(args) != 2 or args[0][1] - args[0][0] != 1 or tokens[args[0][0]][0] != "literal":
+                raise UnsupportedQuery("strftime with modifiers")
+
+            fmt = tokens[args[0][0]][1]
+            expr = query[tokens[args[1][0]][2]:tokens[args[1][1] - 1][3]]
+            # SQLite takes (format, value) on text dates; DuckDB takes (timestamp, format)
+            replacements.append((start, tokens[j][3], f"strftime(CAST({expr} AS TIMESTAMP), {fmt})"))
+            i = j
+
+        i += 1
+
+    for start, end, text in reversed(replacements):
+        query = query[:start] + text + query[end:]
+    return query
+
+
+def _snapshot_name(db_path: str, version: tuple) -> str:
+    digest = hashlib.sha1(f"{os.path.abspath(db_path)}:{version}".encode()).hexdigest()[:16]
+    return f"{digest}.duckdb"
+
+
+def build_snapshot(db_path: str, snapshot_path: str) -> None:
+    tmp_path = f"{snapshot_path}.tmp"
+    # Leftovers from an interrupted build
+    for path in (tmp_path, f"{tmp_path}.wal"):
+        if os.path.exists(path):
+            os.remove(path)
+
+    source = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True, isolation_level=None)
+    target = duckdb.connect(tmp_path)
+    try:
+        # One read transaction gives every table the same point-in-time view
+        source.execute("BEGIN")
+        tables = [
+            row[0] for row in source.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+            )
+        ]
+
+        for table in tables:
+            info = source.execute(f'PRAGMA table_info("{table}")').fetchall()
+            names = [col[1] for col in info]
+            types = [_column_type(col[2]) for col in info]
+
+            columns_sql = ", ".join(f'"{name}" {sql_type}' for name, (sql_type, _) in zip(names, types))
+            target.execute(f'CREATE TABLE "{table}" ({columns_sql})')
+
+            cursor = source.execute(f'SELECT * FROM "{table}"')
+            while True:
+                batch = cursor.fetchmany(SNAPSHOT_BATCH_ROWS)
+                if not batch:
+                    break
+                frame = pd.DataFrame({
+                    name: pd.array([row[index] for row in batch], dtype=dtype)
+                    for index, (name, (_, dtype)) in enumerate(zip(names, types))
+                })
+                target.register("snapshot_batch", frame)
+                target.execute(f'INSERT INTO "{table}" SELECT * FROM snapshot_batch')
+                target.unregister("snapshot_batch")
+
+        source.execute("COMMIT")
+        target.execute("CHECKPOINT")
+    finally:
+        target.close()
+        source.close()
+
+    os.replace(tmp_path, snapshot_path)
+
+
+class AnalyticsQuery:
+
+    def __init__(self, connection, timeout: Optional[float] = None):
+        self.connection = connection
+        self.timeout = timeout
+        self.timed_out = False
+        self.cursor = None
+        self._watchdog: Optional[threading.Timer] = None
+
+    def _on_timeout(self) -> None:
+        self.timed_out = True
+        self.cursor.interrupt()
+
+    def execute(self, query: str):
+        self.cursor.execute(translate_query(query))
+        return self.cursor
+
+    def __enter__(self):
+        # A cursor is a separate DuckDB connection to the same database, safe to use per thread
+        self.cursor = self.connection.cursor()
+        if self.timeout:
+            self._watchdog = threading.Timer(self.timeout, self._on_timeout)
+            self._watchdog.daemon = True
+            self._watchdog.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._watchdog:
+            self._watchdog.cancel()
+        self.cursor.close()
+        return False
+
+
+class AnalyticsEngine:
+
+    def __init__(self, snapshot_dir: str = ANALYTICS_SNAPSHOT_DIR, min_rows: int = ANALYTICS_MIN_ROWS):
+        self.snapshot_dir = snapshot_dir
+        self.min_rows = min_rows
+        self._snapshots = {}
+        self._building = set()
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return duckdb is not None
+
+    def _table_sizes(self, query: str, db_path: str) -> Optional[list[int]]:
+        # None unless every FROM/JOIN target is a table of the SQLite schema (no CTEs or table functions)
+        schema = schema_cache.get_schema(db_path)["schema"]
+        lower = {name.lower(): info for name, info in schema.items()}
+        tables = referenced_tables(query)
+        if not tables or any(table.lower() not in lower for table in tables):
+            return None
+        return [lower[table.lower()]["row_count"] for table in tables]
+
+    def should_route(self, query: str, db_path: str, engine: str = ANALYTICS_ENGINE) -> bool:
+        if engine == "sqlite" or not self.available or not is_analytical_query(query):
+            return False
+        tokens = _tokens(query)
+        # Group order is unspecified; without ORDER BY the row cap would keep a different subset than SQLite
+        if not has_top_level_order_by(query) and any(kind == "word" and text.upper() == "GROUP" for kind, text, _, _ in tokens):
+            return False
+        if any(
+            kind == "word" and text.lower() in SQLITE_ONLY_FUNCTIONS and i + 1 < len(tokens) and tokens[i + 1][1] == "("
+            for i, (kind, text, _, _) in enumerate(tokens)
+        ):
+            return False
+        sizes = self._table_sizes(query, db_path)
+        if sizes is None:
+            return False
+        if engine != "duckdb" and max(sizes) < self.min_rows:
+            return False
+
+        # Until a snapshot of the current data exists, queries stay on SQLite
+        return self.snapshot(db_path, wait=False) is not None
+
+    def snapshot(self, db_path: str, wait: bool = True):
+        key = os.path.abspath(db_path)
+        version = data_version(db_path)
+
+        with self._lock:
+            current = self._snapshots.get(key)
+            if current and current["version"] == version:
+                return current["connection"]
+            building = key in self._building
+            if not building:
+                self._building.add(key)
+
+        if building:
+            return None
+
+        if wait:
+            self._build(db_path, key, version)
+            with self._lock:
+                current = self._snapshots.get(key)
+            return current["connection"] if current and current["version"] == version else None
+
+        threading.Thread(target=self._build, args=(db_path, key, version), daemon=True).start()
+        return None
+
+    def _build(self, db_path: str, key: str, version: tuple) -> None:
+        try:
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            path = os.path.join(self.snapshot_dir, _snapshot_name(db_path, version))
+            if not os.path.exists(path):
+                start = time.perf_counter()
+                build_snapshot(db_path, path)
+                logger.info(f"Analytics snapshot built in {time.perf_counter() - start:.1f}s: {path}")
+
+            connection = duckdb.connect(path, read_only=True, config=SNAPSHOT_CONFIG)
+
+            with self._lock:
+                previous = self._snapshots.get(key)
+                self._snapshots[key] = {"version": version, "path": path, "connection": connection}
+
+            if previous and previous["path"] != path:
+                previous["connection"].close()
+                try:
+                    os.remove(previous["path"])
+                except OSError:
+                    pass
+        except Exception as e:
+            logger.error(f"Could not build analytics snapshot: {str(e)}")
+        finally:
+            with self._lock:
+                self._building.discard(key)
+
+    def query(self, db_path: str, timeout: Optional[float] = None) -> "AnalyticsQuery":
+        connection = self.snapshot(db_path, wait=False)
+        if connection is None:
+            raise UnsupportedQuery("analytics snapshot not ready")
+        return AnalyticsQuery(connection, timeout)
+
+    def clear(self) -> None:
+        with self._lock:
+            snapshots = list(self._snapshots.values())
+            self._snapshots.clear()
+        for snapshot in snapshots:
+            snapshot["connection"].close()
+
+
+analytics_engine = AnalyticsEngine()
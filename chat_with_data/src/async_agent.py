@@ -0,0 +1,140 @@
+import time
+import asyncio
+import logging
+from typing import AsyncGenerator, Optional
+from openai import AsyncOpenAI, APITimeoutError
+
+from src.agent import DataAgent, TurnBudget, TOOL_EXECUTOR, TIMEOUT_MESSAGE
+from src.tools import execute_tool_async
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("ChatWithData.AsyncAgent")
+
+
+class AsyncDataAgent(DataAgent):
+    # Same prompts, history, templates and events as DataAgent, but a turn only holds the
+    # event loop while it computes: model calls and tickets are awaited, SQL runs on TOOL_EXECUTOR
+
+    client_class = AsyncOpenAI
+
+    async def _run_tool_async(self, function_name: str, arguments: dict) -> tuple[dict, float]:
+        start_time = time.perf_counter()
+        with self._span("tool") as span:
+            try:
+                result = await execute_tool_async(function_name, arguments, self.config, executor=TOOL_EXECUTOR)
+            except Exception as e:
+                logger.error(f"Tool {function_name} failed: {str(e)}")
+                result = {"success": False, "error": f"Tool error: {str(e)}"}
+            self._trace_tool(span, function_name, arguments, result)
+        return result, (time.perf_counter() - start_time) * 1000
+
+    async def _process_tool_calls_async(self, tool_calls: list[dict], tool_results: list) -> AsyncGenerator[dict, None]:
+        calls = self._parse_tool_calls(tool_calls)
+        for index, (_, function_name, arguments) in enumerate(calls):
+            yield self._tool_start_event(index, function_name, arguments)
+
+        async def run(index: int, function_name: str, arguments: dict):
+            return index, await self._run_tool_async(function_name, arguments)
+
+        outcomes = [None] * len(calls)
+        tasks = [run(index, function_name, arguments) for index, (_, function_name, arguments) in enumerate(calls)]
+        for finished in asyncio.as_completed(tasks):
+            index, (result, elapsed_ms) = await finished
+            outcomes[index] = result
+            yield self._tool_end_event(index, calls[index][1], calls[index][2], result, elapsed_ms)
+
+        tool_results.extend(self._tool_messages(calls, outcomes))
+
+    async def _stream_completion_async(
+        self,
+        assistant_message: dict,
+        budget: TurnBudget,
+        final_note: Optional[str] = None
+    ) -> AsyncGenerator[dict, None]:
+        request = self._completion_request(budget, final_note)
+
+        with self._span("llm_call", round=budget.rounds, final=bool(final_note)) as span:
+            state = self._new_stream_state()
+            try:
+                stream = await self.client.chat.completions.create(**request)
+                async for chunk in stream:
+                    text = self._accumulate_chunk(chunk, state)
+                    if text:
+                        yield {"type": "text", "content": text}
+            except APITimeoutError:
+                logger.warning(f"Model call timed out after {budget.elapsed():.1f}s of the turn")
+                assistant_message.update(self._assistant_message(state, request, budget, timed_out=True))
+            else:
+                assistant_message.update(self._assistant_message(state, request, budget))
+            self._trace_llm_call(span, state, assistant_message)
+
+    async def chat_events(self, user_message: str) -> AsyncGenerator[dict, None]:
+        budget = self._new_budget()
+        # Refreshing the schema digest and matching templates may touch SQLite
+        template_call = await asyncio.get_running_loop().run_in_executor(TOOL_EXECUTOR, self._start_turn, user_message)
+
+        template_used = False
+        if template_call:
+            tool_results = []
+            async for event in self._process_tool_calls_async([template_call], tool_results):
+                yield event
+            template_used = self._finish_template(template_call, tool_results)
+
+        assistant_message = {}
+        async for event in self._stream_completion_async(assistant_message, budget):
+            yield event
+
+        while assistant_message["tool_calls"]:
+            if assistant_message["content"]:
+                yield {"type": "text", "content": "\n\n"}
+
+            reason = budget.exceeded()
+            if reason:
+                final_note = self._over_budget(budget, reason)
+                if final_note is None:
+                    assistant_message = {"content": assistant_message["content"], "tool_calls": [], "timed_out": True}
+                else:
+                    assistant_message = {}
+                    async for event in self._stream_completion_async(assistant_message, budget, final_note):
+                        yield event
+                    assistant_message["tool_calls"] = []
+                break
+
+            budget.rounds += 1
+            self._add_tool_round(assistant_message)
+
+            tool_results = []
+            async for event in self._process_tool_calls_async(assistant_message["tool_calls"], tool_results):
+                yield event
+            self.conversation_history.extend(tool_results)
+
+            assistant_message = {}
+            async for event in self._stream_completion_async(assistant_message, budget):
+                yield event
+
+        if assistant_message.get("timed_out"):
+            yield {"type": "text", "content": ("\n\n" if assistant_message["content"] else "") + TIMEOUT_MESSAGE}
+
+        self._end_turn(user_message, assistant_message, template_used, budget)
+
+    async def chat(self, user_message: str) -> AsyncGenerator[str, None]:
+        async for event in self.chat_events(user_message):
+            if event["type"] == "text":
+                yield event["content"]
+
+    async def chat_complete(self, user_message: str) -> str:
+        return "".join([part async for part in self.chat(user_message)])
+
+    def chat_sync(self, user_message: str) -> str:
+        # The client's connections belong to the loop that opened them, so scripts reuse one loop per agent
+        if getattr(self, "_sync_loop", None) is None:
+            self._sync_loop = asyncio.new_event_loop()
+        return self._sync_loop.run_until_complete(self.chat_complete(user_message))
+
+    async def close(self) -> None:
+        # Shared clients stay open for the other sessions
+        if self._owns_client:
+            await self.client.close()
@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import asyncio
+import argparse
+import resource
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+from src.tools import get_sample_queries
+
+MOCK_QUERY = get_sample_queries()[0]["query"]
+
+
+def _sse(payload: dict) -> bytes:
+    return f"data: {json.dumps(payload)}\n\n".encode()
+
+
+def _mock_completion(request: dict) -> bytes:
+    # First call of a turn asks for one query; the call after the tool result answers in text
+    chunk = {"id": "mock", "object": "chat.completion.chunk", "created": 0, "model": request.get("model", "mock")}
+    if request["messages"][-1]["role"] == "user":
+        deltas = [{"role": "assistant", "tool_calls": [{
+            "index": 0, "id": "call_mock", "type": "function",
+            "function": {"name": "query_database", "arguments": json.dumps({"query": MOCK_QUERY})}
+        }]}]
+    else:
+        deltas = [{"role": "assistant", "content": ""}] + [{"content": word + " "} for word in "The total revenue is shown above".split()]
+
+    body = b"".join(_sse({**chunk, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}) for delta in deltas)
+    body += _sse({**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+    if (request.get("stream_options") or {}).get("include_usage"):
+        prompt_tokens = len(json.dumps(request["messages"])) // 4
+        body += _sse({**chunk, "choices": [], "usage": {
+            "prompt_tokens": prompt_tokens, "completion_tokens": 20, "total_tokens": prompt_tokens + 20
+        }})
+    return body + b"data: [DONE]\n\n"
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, latency: float) -> None:
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            headers = dict(
+                line.split(": ", 1) for line in head.decode("latin-1").split("\r\n")[1:] if ": " in line
+            )
+            length = int({key.lower(): value for key, value in headers.items()}.get("content-length", 0))
+            request = json.loads(await reader.readexactly(length)) if length else {}
+
+            # Fixed time to first token, standing in for model latency
+            await asyncio.sleep(latency)
+            body = _mock_completion(request)
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                + f"Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+def run_mock_server(port: int, latency: float, ready) -> None:
+    async def serve():
+        server = await asyncio.start_server(
+            lambda reader, writer: _handle(reader, writer, latency), "127.0.0.1", port, backlog=4096
+        )
+        ready.set()
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def bench_sync(sessions: int, workers: int, config: dict) -> tuple[float, int]:
+    from src.agent import DataAgent
+
+    agents = [DataAgent(api_key="mock", config=config) for _ in range(sessions)]
+    peak_threads = 0
+
+    def turn(agent):
+        nonlocal peak_threads
+        peak_threads = max(peak_threads, threading.active_count())
+        return agent.chat_sync("What is the total revenue?")
+
+    start = time.perf_counter()
+    # Thread-per-request serving: a worker is held for the whole turn, including model latency
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(turn, agents))
+    return time.perf_counter() - start, peak_threads
+
+
+async def bench_async(sessions: int, config: dict) -> tuple[float, int]:
+    from src.async_agent import AsyncDataAgent
+
+    agents = [AsyncDataAgent(api_key="mock", config=config) for _ in range(sessions)]
+    start = time.perf_counter()
+    await asyncio.gather(*(agent.chat_complete("What is the total revenue?") for agent in agents))
+    elapsed = time.perf_counter() - start
+    peak_threads = threading.active_count()
+    await asyncio.gather(*(agent.close() for agent in agents))
+    return elapsed, peak_threads
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sessions per process for DataAgent vs AsyncDataAgent against a mock LLM")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--latency", type=float, default=0.5, help="Mock model latency per call in seconds")
+    parser.add_argument("--sync-workers", type=int, default=32, help="Worker threads for the synchronous agent")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", default="data/ecommerce.db")
+    args = parser.parse_args()
+
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=run_mock_server, args=(args.port, args.latency, ready), daemon=True)
+    server.start()
+    ready.wait(10)
+
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    # Every session runs the same turn, so template reuse is disabled to keep two model calls per turn.
+    # Tracing is off so benchmark turns do not fill the app's Performance tab.
+    config = {"db_path": args.db, "template_cache": False, "tracing": False}
+
+    ideal = 2 * args.latency
+    print(f"Mock latency {args.latency * 1000:.0f} ms per model call, 2 calls + 1 query per turn (ideal turn {ideal:.2f}s)")
+    print(f"{'Sessions':>8} {'Agent':<24} {'Wall (s)':>9} {'Turns/s':>8} {'Threads':>8} {'Peak RSS (MB)':>14}")
+
+    try:
+        for sessions in args.sessions:
+            elapsed, threads = bench_sync(sessions, args.sync_workers, config)
+            print(f"{sessions:>8} {f'DataAgent ({args.sync_workers} threads)':<24} {elapsed:>9.2f} {sessions / elapsed:>8.1f} {threads:>8} {_peak_rss_mb():>14.0f}")
+
+            elapsed, threads = asyncio.run(bench_async(sessions, config))
+            print(f"{sessions:>8} {'AsyncDataAgent':<24} {elapsed:>9.2f} {sessions / elapsed:>8.1f} {threads:>8} {_peak_rss_mb():>14.0f}")
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
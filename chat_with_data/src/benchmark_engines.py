@@ -0,0 +1,82 @@
+import os
+import time
+import sqlite3
+import argparse
+import tempfile
+import statistics
+
+from src.analytics_engine import AnalyticsEngine, translate_query
+from src.benchmark_indexes import WORKLOAD_QUERIES
+from src.database_setup import create_database, create_indexes, populate_database
+from src.tools import get_sample_queries
+
+
+def time_sqlite(conn: sqlite3.Connection, query: str, repeats: int) -> tuple[float, list]:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        rows = conn.execute(query).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), rows
+
+
+def time_duckdb(engine: AnalyticsEngine, db_path: str, query: str, repeats: int) -> tuple[float, list]:
+    timings = []
+    rows = []
+    for _ in range(repeats):
+        with engine.query(db_path) as analytics_query:
+            start = time.perf_counter()
+            rows = analytics_query.execute(query).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), rows
+
+
+def run_benchmark(scale_factors: list[float], repeats: int) -> None:
+    queries = get_sample_queries() + WORKLOAD_QUERIES
+
+    for scale_factor in scale_factors:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, "benchmark.db")
+            conn = create_database(db_path)
+            populate_database(conn, scale_factor=scale_factor, seed=42)
+            create_indexes(conn)
+            conn.close()
+
+            engine = AnalyticsEngine(snapshot_dir=os.path.join(tmp_dir, "snapshots"))
+            start = time.perf_counter()
+            engine.snapshot(db_path, wait=True)
+            snapshot_seconds = time.perf_counter() - start
+
+            print(f"\n=== Scale factor {scale_factor:g} (snapshot built in {snapshot_seconds:.1f}s) ===")
+            print(f"{'Query':<32} {'SQLite (ms)':>12} {'DuckDB (ms)':>12} {'Speedup':>9}")
+
+            conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+            for q in queries:
+                name = q["description"]
+                sqlite_ms, sqlite_rows = time_sqlite(conn, q["query"], repeats)
+                try:
+                    translate_query(q["query"])
+                    duckdb_ms, duckdb_rows = time_duckdb(engine, db_path, q["query"], repeats)
+                except Exception as e:
+                    print(f"{name:<32} {sqlite_ms:>12.2f} {'fallback':>12}   ({type(e).__name__})")
+                    continue
+
+                note = "" if len(duckdb_rows) == len(sqlite_rows) else "  (row count differs)"
+                speedup = sqlite_ms / duckdb_ms if duckdb_ms else float("inf")
+                print(f"{name:<32} {sqlite_ms:>12.2f} {duckdb_ms:>12.2f} {speedup:>8.1f}x{note}")
+
+            conn.close()
+            engine.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare SQLite and the DuckDB analytics engine on the sample queries")
+    parser.add_argument("--scale-factors", type=float, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    run_benchmark(args.scale_factors, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
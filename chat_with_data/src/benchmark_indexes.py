@@ -0,0 +1,78 @@
+import os
+import time
+import sqlite3
+import argparse
+import tempfile
+import statistics
+
+from src.database_setup import BASE_ORDERS, create_database, create_indexes, populate_database
+from src.tools import get_sample_queries
+
+WORKLOAD_QUERIES = [
+    {
+        "description": "Orders for one customer",
+        "query": "SELECT order_id, order_date, status, total_amount FROM orders WHERE customer_id = 42 ORDER BY order_date DESC"
+    },
+    {
+        "description": "Items in one order",
+        "query": "SELECT p.name, oi.quantity, oi.unit_price FROM order_items oi JOIN products p ON p.product_id = oi.product_id WHERE oi.order_id = 100"
+    },
+    {
+        "description": "Pending orders in date range",
+        "query": "SELECT COUNT(*), SUM(total_amount) FROM orders WHERE status = 'pending' AND order_date >= date('now', '-30 days')"
+    },
+    {
+        "description": "Top products by revenue",
+        "query": "SELECT p.name, SUM(oi.quantity * oi.unit_price) AS revenue FROM order_items oi JOIN products p ON p.product_id = oi.product_id GROUP BY oi.product_id ORDER BY revenue DESC LIMIT 10"
+    },
+]
+
+
+def build_database(db_path: str, num_orders: int):
+    conn = create_database(db_path)
+    populate_database(conn, scale_factor=num_orders / BASE_ORDERS, seed=42)
+    return conn
+
+
+def time_query(conn: sqlite3.Connection, query: str, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        conn.execute(query).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def run_benchmark(order_counts: list[int], repeats: int) -> None:
+    queries = get_sample_queries() + WORKLOAD_QUERIES
+
+    for num_orders in order_counts:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, "benchmark.db")
+            print(f"\n=== {num_orders:,} orders (scale factor {num_orders / BASE_ORDERS:g}) ===")
+            conn = build_database(db_path, num_orders)
+
+            before = {q["description"]: time_query(conn, q["query"], repeats) for q in queries}
+            create_indexes(conn)
+            after = {q["description"]: time_query(conn, q["query"], repeats) for q in queries}
+            conn.close()
+
+            print(f"{'Query':<32} {'Before (ms)':>12} {'After (ms)':>12} {'Speedup':>9}")
+            for q in queries:
+                name = q["description"]
+                speedup = before[name] / after[name] if after[name] else float("inf")
+                print(f"{name:<32} {before[name]:>12.2f} {after[name]:>12.2f} {speedup:>8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sample queries before and after creating indexes")
+    parser.add_argument("--orders", type=int, nargs="+", default=[600, 6000, 60000],
+                        help="Order counts to benchmark")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    run_benchmark(args.orders, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
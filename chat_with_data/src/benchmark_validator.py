@@ -0,0 +1,84 @@
+import re
+import time
+import argparse
+import statistics
+
+from src.sql_validator import validate_query
+from src.tools import get_sample_queries
+
+# Expected verdict for each query: True when it should be allowed
+CORPUS = [(q["query"], True) for q in get_sample_queries()] + [
+    ("SELECT REPLACE(name, 'Pro', 'Plus') AS name FROM products", True),
+    ("SELECT name FROM products WHERE name LIKE '%;%'", True),
+    ("SELECT 'drop table; delete' AS note", True),
+    ("SELECT created_at AS last_update FROM customers -- recent first\nORDER BY created_at DESC", True),
+    ("WITH monthly AS (SELECT strftime('%Y-%m', order_date) AS month, SUM(total_amount) AS revenue FROM orders GROUP BY month) SELECT * FROM monthly ORDER BY month", True),
+    ("WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 5) SELECT x FROM n", True),
+    ("SELECT * FROM customers;", True),
+    ("SELECT order_id, CASE WHEN total_amount > 500 THEN 'large' ELSE 'small' END AS size FROM orders", True),
+    ("DROP TABLE customers", False),
+    ("SELECT * FROM customers; DROP TABLE customers", False),
+    ("WITH x AS (SELECT 1) DELETE FROM orders", False),
+    ("DELETE FROM orders WHERE 1=1", False),
+    ("ATTACH DATABASE '/tmp/x.db' AS x", False),
+    ("PRAGMA writable_schema = ON", False),
+    ("SELECT load_extension('evil')", False),
+    ("SELECT * FROM customers /* unterminated", True),
+    ("SELECT 'unterminated FROM customers", False),
+]
+
+
+# The keyword list of the previous implementation, frozen so the baseline does not pick up later additions
+REGEX_DANGEROUS_KEYWORDS = [
+    "DROP", "DELETE", "TRUNCATE", "ALTER", "CREATE", "INSERT", "UPDATE",
+    "REPLACE", "RENAME", "GRANT", "REVOKE", "COMMIT", "ROLLBACK",
+    "ATTACH", "DETACH", "VACUUM", "REINDEX", "PRAGMA"
+]
+
+
+def regex_is_safe_query(query: str) -> bool:
+    # The previous implementation, kept here as the baseline
+    normalized = query.upper().strip()
+    normalized = re.sub(r'--.*$', '', normalized, flags=re.MULTILINE)
+    normalized = re.sub(r'/\*.*?\*/', '', normalized, flags=re.DOTALL)
+
+    if not normalized.startswith("SELECT"):
+        return False
+    for keyword in REGEX_DANGEROUS_KEYWORDS:
+        if re.search(rf'\b{keyword}\b', normalized):
+            return False
+    statements = [s.strip() for s in query.split(';') if s.strip()]
+    return len(statements) <= 1
+
+
+def time_validator(validator, queries: list[str], repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for query in queries:
+            validator(query)
+        timings.append((time.perf_counter() - start) / len(queries) * 1_000_000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SQL safety validation overhead and accuracy")
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    validators = {
+        "regex (previous)": regex_is_safe_query,
+        "tokenizer": lambda query: validate_query(query)[0],
+    }
+    queries = [query for query, _ in CORPUS]
+
+    print(f"{'Validator':<18} {'us/query':>10} {'Wrongly blocked':>16} {'Wrongly allowed':>16}")
+    for name, validator in validators.items():
+        per_query = time_validator(validator, queries, args.repeats)
+        blocked = sum(1 for query, allowed in CORPUS if allowed and not validator(query))
+        allowed = sum(1 for query, allowed in CORPUS if not allowed and validator(query))
+        print(f"{name:<18} {per_query:>10.1f} {blocked:>16} {allowed:>16}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import sqlite3
+import logging
+import threading
+import queue
+from contextlib import contextmanager
+from pathlib import Path
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("ChatWithData.Pool")
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_CACHE_SIZE_KB = 32 * 1024
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024
+
+
+class ReadOnlyConnectionPool:
+
+    def __init__(
+        self,
+        db_path: str,
+        max_size: int = DEFAULT_POOL_SIZE,
+        cache_size_kb: int = DEFAULT_CACHE_SIZE_KB,
+        mmap_size: int = DEFAULT_MMAP_SIZE,
+        timeout: float = 10.0
+    ):
+        self.db_path = db_path
+        self.uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+        self.max_size = max_size
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+        self.timeout = timeout
+
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+        # The pool never changes the database file; WAL mode is set once when database_setup creates it
+        logger.info(f"Read-only connection pool created for {db_path} (max {max_size})")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.uri, uri=True, check_same_thread=False, timeout=self.timeout)
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kb)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.max_size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"Timed out after {self.timeout}s waiting for a database connection"
+            )
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        self._idle.put(conn)
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except sqlite3.DatabaseError as e:
+            # A connection that hit a low-level error is not trusted for reuse
+            if not isinstance(e, sqlite3.OperationalError):
+                self._discard(conn)
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                self.release(conn)
+
+    def close(self) -> None:
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def stats(self) -> dict:
+        return {
+            "db_path": self.db_path,
+            "max_size": self.max_size,
+            "open_connections": self._created,
+            "idle_connections": self._idle.qsize()
+        }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(db_path: str = "data/ecommerce.db") -> ReadOnlyConnectionPool:
+    key = str(Path(db_path).resolve())
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ReadOnlyConnectionPool(db_path)
+            _pools[key] = pool
+        return pool
@@ -0,0 +1,190 @@
+import os
+import copy
+import time
+import logging
+import threading
+
+from src.connection_pool import get_connection_pool
+from src.result_cache import data_version
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("ChatWithData.Dashboard")
+
+FULL_REFRESH_SECONDS = 300
+
+
+# New rows are folded in by id watermark; the periodic full refresh picks up
+# in-place updates (e.g. an order moving to 'delivered') that watermarks miss.
+class DashboardStats:
+
+    def __init__(self, full_refresh_seconds: float = FULL_REFRESH_SECONDS):
+        self.full_refresh_seconds = full_refresh_seconds
+        self._states = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def _full_refresh(self, conn) -> dict:
+        state = {
+            "counts": {},
+            "watermarks": {},
+            "delivered_sum": 0.0,
+            "delivered_count": 0,
+            "orders_by_status": {},
+            "revenue_by_category": {}
+        }
+
+        for table, key in [("customers", "customer_id"), ("products", "product_id"),
+                           ("orders", "order_id"), ("order_items", "item_id")]:
+            count, watermark = conn.execute(f"SELECT COUNT(*), MAX({key}) FROM {table}").fetchone()
+            state["counts"][table] = count
+            state["watermarks"][table] = watermark or 0
+
+        delivered_sum, delivered_count = conn.execute(
+            "SELECT SUM(total_amount), COUNT(*) FROM orders WHERE status = 'delivered'"
+        ).fetchone()
+        state["delivered_sum"] = delivered_sum or 0.0
+        state["delivered_count"] = delivered_count
+
+        state["orders_by_status"] = dict(
+            conn.execute("SELECT status, COUNT(*) FROM orders GROUP BY status").fetchall()
+        )
+
+        state["revenue_by_category"] = dict(conn.execute("""
+            SELECT p.category, SUM(oi.quantity * oi.unit_price) as revenue
+            FROM products p
+            JOIN order_items oi ON p.product_id = oi.product_id
+            GROUP BY p.category
+        """).fetchall())
+
+        state["refreshed_at"] = time.time()
+        logger.info("Dashboard stats fully refreshed")
+        return state
+
+    def _incremental_refresh(self, conn, state: dict) -> None:
+        watermarks = state["watermarks"]
+
+        count, watermark = conn.execute(
+            "SELECT COUNT(*), MAX(customer_id) FROM customers WHERE customer_id > ?",
+            (watermarks["customers"],)
+        ).fetchone()
+        if count:
+            state["counts"]["customers"] += count
+            watermarks["customers"] = watermark
+
+        state["counts"]["products"] = conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+        new_orders = conn.execute("""
+            SELECT status, COUNT(*),
+                   SUM(CASE WHEN status = 'delivered' THEN total_amount ELSE 0 END),
+                   MAX(order_id)
+            FROM orders
+            WHERE order_id > ?
+            GROUP BY status
+        """, (watermarks["orders"],)).fetchall()
+        for status, count, delivered_sum, watermark in new_orders:
+            state["counts"]["orders"] += count
+            state["orders_by_status"][status] = state["orders_by_status"].get(status, 0) + count
+            if status == "delivered":
+                state["delivered_sum"] += delivered_sum or 0.0
+                state["delivered_count"] += count
+            watermarks["orders"] = max(watermarks["orders"], watermark)
+
+        item_watermark = watermarks["order_items"]
+        count, watermark = conn.execute(
+            "SELECT COUNT(*), MAX(item_id) FROM order_items WHERE item_id > ?",
+            (item_watermark,)
+        ).fetchone()
+        if count:
+            new_revenue = conn.execute("""
+                SELECT p.category, SUM(oi.quantity * oi.unit_price)
+                FROM order_items oi
+                JOIN products p ON p.product_id = oi.product_id
+                WHERE oi.item_id > ?
+                GROUP BY p.category
+            """, (item_watermark,)).fetchall()
+            for category, revenue in new_revenue:
+                state["revenue_by_category"][category] = state["revenue_by_category"].get(category, 0.0) + (revenue or 0.0)
+            state["counts"]["order_items"] += count
+            watermarks["order_items"] = watermark
+
+    def get(self, db_path: str) -> dict:
+        key = os.path.abspath(db_path)
+        version = data_version(db_path)
+
+        # The lock only guards the snapshots; queries run outside it so readers never wait on a refresh
+        with self._lock:
+            state = self._states.get(key)
+
+        if state is None:
+            # Nothing to serve yet, so the first caller waits for the full load
+            state = self._refresh_full(db_path, key, version)
+        else:
+            if time.time() - state["refreshed_at"] > self.full_refresh_seconds:
+                self._start_full_refresh(db_path, key)
+            if state["version"] != version:
+                state = self._refresh_incremental(db_path, key, state, version)
+
+        return self._format(state)
+
+    def _refresh_full(self, db_path: str, key: str, version: tuple) -> dict:
+        with get_connection_pool(db_path).connection() as conn:
+            state = self._full_refresh(conn)
+        state["version"] = version
+        with self._lock:
+            self._states[key] = state
+        return state
+
+    def _start_full_refresh(self, db_path: str, key: str) -> None:
+        # One background refresh per database; callers keep getting the stale snapshot meanwhile
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        threading.Thread(target=self._background_refresh, args=(db_path, key), daemon=True).start()
+
+    def _background_refresh(self, db_path: str, key: str) -> None:
+        try:
+            self._refresh_full(db_path, key, data_version(db_path))
+        except Exception as e:
+            logger.error(f"Dashboard stats refresh failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _refresh_incremental(self, db_path: str, key: str, state: dict, version: tuple) -> dict:
+        # Work on a copy so a failed refresh never leaves half-applied totals
+        updated = copy.deepcopy(state)
+        with get_connection_pool(db_path).connection() as conn:
+            self._incremental_refresh(conn, updated)
+        updated["version"] = version
+        with self._lock:
+            # A full refresh that landed meanwhile is newer than this copy
+            if self._states.get(key) is state:
+                self._states[key] = updated
+        return updated
+
+    def _format(self, state: dict) -> dict:
+        stats = {f"{table}_count": count for table, count in state["counts"].items()}
+        stats["total_revenue"] = state["delivered_sum"]
+        stats["avg_order_value"] = (
+            state["delivered_sum"] / state["delivered_count"] if state["delivered_count"] else 0
+        )
+        stats["orders_by_status"] = dict(sorted(state["orders_by_status"].items()))
+        stats["revenue_by_category"] = dict(
+            sorted(state["revenue_by_category"].items(), key=lambda item: item[1], reverse=True)
+        )
+        stats["refreshed_at"] = state["refreshed_at"]
+        return stats
+
+    def invalidate(self, db_path: str = None) -> None:
+        with self._lock:
+            if db_path is None:
+                self._states.clear()
+            else:
+                self._states.pop(os.path.abspath(db_path), None)
+
+
+dashboard_stats = DashboardStats()
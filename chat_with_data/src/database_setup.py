@@ -1,5 +1,10 @@
 import sqlite3
 import random
+import argparse
+import time
+from contextlib import contextmanager
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 import os
 
@@ -93,14 +98,29 @@ PRODUCT_CATEGORIES = {
     ],
 }
 
+INDEXES = {
+    "idx_orders_customer_id": "orders (customer_id)",
+    "idx_orders_status_order_date": "orders (status, order_date, total_amount)",
+    "idx_orders_order_date": "orders (order_date, total_amount)",
+    "idx_order_items_order_id": "order_items (order_id)",
+    "idx_order_items_product_id": "order_items (product_id, quantity, unit_price)",
+    "idx_products_category": "products (category)",
+}
+
 ORDER_STATUSES = ["pending", "processing", "shipped", "delivered", "cancelled"]
 PAYMENT_METHODS = ["credit_card", "debit_card", "paypal", "apple_pay", "google_pay"]
 
+# Scale factor 1 is the default demo dataset
+BASE_CUSTOMERS = 150
+BASE_ORDERS = 600
+ORDER_CHUNK_SIZE = 10000
+
 
 def create_database(db_path: str = "data/ecommerce.db"):
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
 
     conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
     cursor = conn.cursor()
 
     cursor.execute("""
@@ -157,42 +177,70 @@ def create_database(db_path: str = "data/ecommerce.db"):
     return conn
 
 
-def populate_customers(conn, num_customers: int = 150):
+def create_indexes(conn):
     cursor = conn.cursor()
 
-    customers = []
-    used_emails = set()
+    for name, definition in INDEXES.items():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {definition}")
+
+    # Fresh statistics let the planner pick these indexes and give cheap row estimates
+    cursor.execute("ANALYZE")
+    conn.commit()
+    print(f"Created {len(INDEXES)} indexes")
+
+
+@contextmanager
+def bulk_load(conn):
+    # Durability is pointless while generating a throwaway dataset; restore it afterwards
+    synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-262144")
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute(f"PRAGMA synchronous={synchronous}")
+
+
+def populate_customers(conn, num_customers: int = 150, commit: bool = True):
+    cursor = conn.cursor()
+    now = datetime.now()
+    email_counters = {}
 
-    for i in range(num_customers):
-        first_name = random.choice(FIRST_NAMES)
-        last_name = random.choice(LAST_NAMES)
+    def generate():
+        for _ in range(num_customers):
+            first_name = random.choice(FIRST_NAMES)
+            last_name = random.choice(LAST_NAMES)
 
-        email_base = f"{first_name.lower()}.{last_name.lower()}"
-        email = f"{email_base}@email.com"
-        counter = 1
-        while email in used_emails:
-            email = f"{email_base}{counter}@email.com"
-            counter += 1
-        used_emails.add(email)
+            # A counter per name keeps email generation O(1) even with millions of customers
+            email_base = f"{first_name.lower()}.{last_name.lower()}"
+            counter = email_counters.get(email_base, 0)
+            email_counters[email_base] = counter + 1
+            email = f"{email_base}{counter or ''}@email.com"
 
-        city, state = random.choice(CITIES)
-        phone = f"+1-{random.randint(200,999)}-{random.randint(100,999)}-{random.randint(1000,9999)}"
+            city, state = random.choice(CITIES)
+            phone = f"+1-{random.randint(200,999)}-{random.randint(100,999)}-{random.randint(1000,9999)}"
 
-        days_ago = random.randint(1, 730)
-        created_at = datetime.now() - timedelta(days=days_ago)
+            days_ago = random.randint(1, 730)
+            created_at = (now - timedelta(days=days_ago)).isoformat(" ")
 
-        customers.append((first_name, last_name, email, phone, city, state, created_at))
+            yield (first_name, last_name, email, phone, city, state, created_at)
 
     cursor.executemany("""
         INSERT INTO customers (first_name, last_name, email, phone, city, state, created_at)
         VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, customers)
+    """, generate())
 
-    conn.commit()
+    if commit:
+        conn.commit()
     print(f"Inserted {num_customers} customers")
 
 
-def populate_products(conn):
+def populate_products(conn, commit: bool = True):
     cursor = conn.cursor()
 
     products = []
@@ -200,7 +248,7 @@ def populate_products(conn):
         for name, cost, price in items:
             stock = random.randint(10, 500)
             days_ago = random.randint(30, 365)
-            created_at = datetime.now() - timedelta(days=days_ago)
+            created_at = (datetime.now() - timedelta(days=days_ago)).isoformat(" ")
             products.append((name, category, price, cost, stock, created_at))
 
     cursor.executemany("""
@@ -208,85 +256,180 @@ def populate_products(conn):
         VALUES (?, ?, ?, ?, ?, ?)
     """, products)
 
-    conn.commit()
+    if commit:
+        conn.commit()
     print(f"Inserted {len(products)} products")
 
 
-def populate_orders(conn, num_orders: int = 600):
-    cursor = conn.cursor()
+_worker_state = {}
 
-    cursor.execute("SELECT customer_id FROM customers")
-    customer_ids = [row[0] for row in cursor.fetchall()]
 
-    cursor.execute("SELECT product_id, price FROM products")
-    products = [(row[0], row[1]) for row in cursor.fetchall()]
+def _init_order_worker(customer_ids, products, now):
+    _worker_state.update(customer_ids=customer_ids, products=products, now=now)
+
 
-    for _ in range(num_orders):
-        customer_id = random.choice(customer_ids)
+def _generate_order_chunk(args):
+    first_order_id, num_orders, seed = args
+    rng = random.Random(seed)
+    # Indexing with rng.random() avoids the per-call overhead of randint/choice in this hot loop
+    rand = rng.random
+    customer_ids = _worker_state["customer_ids"]
+    products = _worker_state["products"]
+    now = _worker_state["now"]
+    num_customers = len(customer_ids)
+    max_items = min(5, len(products))
 
-        days_ago = random.randint(1, 365)
-        order_date = datetime.now() - timedelta(days=days_ago, hours=random.randint(0, 23))
+    orders, items = [], []
+    for order_id in range(first_order_id, first_order_id + num_orders):
+        customer_id = customer_ids[int(rand() * num_customers)]
 
+        days_ago = 1 + int(rand() * 365)
+        order_date = (now - timedelta(days=days_ago, hours=int(rand() * 24))).isoformat(" ")
+
+        roll = rand()
         if days_ago < 3:
-            status = random.choice(["pending", "processing"])
+            status = "pending" if roll < 0.5 else "processing"
         elif days_ago < 7:
-            status = random.choices(["processing", "shipped", "delivered"], weights=[0.2, 0.5, 0.3])[0]
+            status = "processing" if roll < 0.2 else "shipped" if roll < 0.7 else "delivered"
         else:
-            status = random.choices(["delivered", "cancelled"], weights=[0.9, 0.1])[0]
-
-        payment_method = random.choice(PAYMENT_METHODS)
-        city, state = random.choice(CITIES)
-        shipping_address = f"{random.randint(100, 9999)} Main St, {city}, {state}"
-
-        cursor.execute("""
-            INSERT INTO orders (customer_id, order_date, status, payment_method, shipping_address)
-            VALUES (?, ?, ?, ?, ?)
-        """, (customer_id, order_date, status, payment_method, shipping_address))
+            status = "delivered" if roll < 0.9 else "cancelled"
 
-        order_id = cursor.lastrowid
+        payment_method = PAYMENT_METHODS[int(rand() * len(PAYMENT_METHODS))]
+        city, state = CITIES[int(rand() * len(CITIES))]
+        shipping_address = f"{100 + int(rand() * 9900)} Main St, {city}, {state}"
 
-        num_items = random.randint(1, 5)
-        order_products = random.sample(products, min(num_items, len(products)))
+        order_products = rng.sample(products, 1 + int(rand() * max_items))
 
+        # Totals are computed up front so each order is written once, with no follow-up UPDATE
         total_amount = 0
         for product_id, price in order_products:
-            quantity = random.randint(1, 3)
-            cursor.execute("""
-                INSERT INTO order_items (order_id, product_id, quantity, unit_price)
-                VALUES (?, ?, ?, ?)
-            """, (order_id, product_id, quantity, price))
+            quantity = 1 + int(rand() * 3)
+            items.append((order_id, product_id, quantity, price))
             total_amount += price * quantity
 
-        cursor.execute("""
-            UPDATE orders SET total_amount = ? WHERE order_id = ?
-        """, (round(total_amount, 2), order_id))
+        orders.append((order_id, customer_id, order_date, status, payment_method,
+                       shipping_address, round(total_amount, 2)))
 
-    conn.commit()
+    return orders, items
+
+
+def _generate_in_window(pool, chunks, window: int):
+    # At most `window` chunks are generated or waiting to be inserted at any time, so memory does
+    # not grow with the scale factor. Results are taken oldest first to keep item_ids deterministic.
+    chunks = iter(chunks)
+    pending = deque()
+    for chunk in chunks:
+        pending.append(pool.submit(_generate_order_chunk, chunk))
+        if len(pending) >= window:
+            break
+    while pending:
+        result = pending.popleft().result()
+        for chunk in chunks:
+            pending.append(pool.submit(_generate_order_chunk, chunk))
+            break
+        yield result
 
-    cursor.execute("SELECT COUNT(*) FROM order_items")
-    num_items = cursor.fetchone()[0]
+
+def populate_orders(conn, num_orders: int = 600, workers: int = 1,
+                    chunk_size: int = ORDER_CHUNK_SIZE, seed: int = None, commit: bool = True):
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT customer_id FROM customers")
+    customer_ids = [row[0] for row in cursor.fetchall()]
+
+    cursor.execute("SELECT product_id, price FROM products")
+    products = [(row[0], row[1]) for row in cursor.fetchall()]
+
+    cursor.execute("SELECT COALESCE(MAX(order_id), 0) FROM orders")
+    next_order_id = cursor.fetchone()[0] + 1
+
+    # Each chunk owns a fixed ID range and seed, so the output is identical for any worker count
+    base_seed = seed if seed is not None else random.randrange(2 ** 32)
+    chunks = (
+        (next_order_id + offset, min(chunk_size, num_orders - offset), base_seed + offset)
+        for offset in range(0, num_orders, chunk_size)
+    )
+
+    now = datetime.now()
+    num_items = 0
+
+    if workers > 1 and num_orders > chunk_size:
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_order_worker,
+            initargs=(customer_ids, products, now)
+        )
+        results = _generate_in_window(pool, chunks, window=2 * workers)
+    else:
+        pool = None
+        _init_order_worker(customer_ids, products, now)
+        results = map(_generate_order_chunk, chunks)
+
+    try:
+        # SQLite has a single writer, so workers only generate rows and this process inserts them
+        for orders, items in results:
+            cursor.executemany("""
+                INSERT INTO orders (order_id, customer_id, order_date, status, payment_method, shipping_address, total_amount)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, orders)
+            cursor.executemany("""
+                INSERT INTO order_items (order_id, product_id, quantity, unit_price)
+                VALUES (?, ?, ?, ?)
+            """, items)
+            num_items += len(items)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if commit:
+        conn.commit()
 
     print(f"Inserted {num_orders} orders with {num_items} order items")
 
 
+def populate_database(conn, scale_factor: float = 1, workers: int = 1, seed: int = None):
+    num_customers = max(1, int(BASE_CUSTOMERS * scale_factor))
+    num_orders = max(1, int(BASE_ORDERS * scale_factor))
+
+    if seed is not None:
+        random.seed(seed)
+
+    with bulk_load(conn):
+        populate_customers(conn, num_customers=num_customers, commit=False)
+        populate_products(conn, commit=False)
+        populate_orders(conn, num_orders=num_orders, workers=workers, seed=seed, commit=False)
+
+
 def main():
-    db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "ecommerce.db")
+    parser = argparse.ArgumentParser(description="Create and populate the e-commerce database")
+    parser.add_argument("--db", default=os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "ecommerce.db"))
+    parser.add_argument("--scale-factor", type=float, default=1,
+                        help=f"Multiplier for the base {BASE_CUSTOMERS} customers / {BASE_ORDERS} orders")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes used to generate order rows")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    db_path = args.db
 
     if os.path.exists(db_path):
         os.remove(db_path)
         print(f"Removed existing database: {db_path}")
+    # A stale WAL next to the new file would be replayed into it
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
 
     print("Creating database...")
     conn = create_database(db_path)
 
-    print("Populating customers...")
-    populate_customers(conn, num_customers=150)
-
-    print("Populating products...")
-    populate_products(conn)
+    print(f"Populating data (scale factor {args.scale_factor:g})...")
+    start = time.perf_counter()
+    populate_database(conn, scale_factor=args.scale_factor, workers=args.workers, seed=args.seed)
+    print(f"Loaded data in {time.perf_counter() - start:.1f}s")
 
-    print("Populating orders...")
-    populate_orders(conn, num_orders=600)
+    print("Creating indexes...")
+    create_indexes(conn)
 
     cursor = conn.cursor()
     print("\n=== Database Summary ===")
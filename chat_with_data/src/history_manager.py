@@ -0,0 +1,128 @@
+import os
+import json
+import logging
+
+from src.result_format import count_tokens, split_encoded, token_encoding
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("ChatWithData.History")
+
+HISTORY_MAX_TOKENS = int(os.environ.get("HISTORY_MAX_TOKENS", "12000"))
+HISTORY_KEEP_TURNS = int(os.environ.get("HISTORY_KEEP_TURNS", "2"))
+PREVIEW_ROWS = 3
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def elide_tool_result(content: str) -> str:
+    try:
+        result, table = split_encoded(content)
+    except (TypeError, ValueError):
+        return content
+    if not isinstance(result, dict) or result.get("elided"):
+        return content
+
+    if table:
+        # Header line(s) plus the first rows of the CSV/markdown table
+        header_lines = 2 if result["format"] == "markdown" else 1
+        summary = dict(result)
+        preview = table[:header_lines + PREVIEW_ROWS]
+    else:
+        summary = {key: value for key, value in result.items() if key not in ("data", "schema")}
+        preview = None
+
+        # Column names and row counts are enough for the model to refer back to an old result
+        if result.get("data") is not None:
+            summary["preview"] = result["data"][:PREVIEW_ROWS]
+        if result.get("schema") is not None:
+            summary["tables"] = {
+                table_name: [column["name"] for column in info.get("columns", [])]
+                for table_name, info in result["schema"].items()
+            }
+
+    summary["elided"] = True
+    summary["note"] = "Older result trimmed to save context; re-run the query if the full rows are needed."
+    elided = json.dumps(summary, separators=(",", ":"), default=str)
+    if preview is not None:
+        elided = "\n".join([elided] + preview)
+    # Small results are already cheaper than their summary
+    return elided if len(elided) < len(content) else content
+
+
+class HistoryManager:
+
+    def __init__(
+        self,
+        max_tokens: int = HISTORY_MAX_TOKENS,
+        keep_turns: int = HISTORY_KEEP_TURNS,
+        model: str = "gpt-4o-mini"
+    ):
+        self.max_tokens = max_tokens
+        self.keep_turns = keep_turns
+        self.encoding = token_encoding(model) or False
+        self._token_counts = {}
+
+    def count_text(self, text: str) -> int:
+        return count_tokens(text, self.encoding)
+
+    def count_message(self, message: dict) -> int:
+        # Messages are never mutated in place, so the object identity is a safe cache key
+        cached = self._token_counts.get(id(message))
+        if cached is not None and cached[0] is message:
+            return cached[1]
+
+        count = MESSAGE_OVERHEAD_TOKENS + self.count_text(message.get("content"))
+        for tool_call in message.get("tool_calls") or []:
+            count += self.count_text(tool_call["function"]["name"]) + self.count_text(tool_call["function"]["arguments"])
+
+        self._token_counts[id(message)] = (message, count)
+        return count
+
+    def count(self, messages: list[dict]) -> int:
+        return sum(self.count_message(message) for message in messages)
+
+    def _elide(self, messages: list[dict], start: int, end: int) -> int:
+        elided = 0
+        for index in range(start, end):
+            message = messages[index]
+            if message["role"] == "tool":
+                content = elide_tool_result(message["content"])
+                if content != message["content"]:
+                    messages[index] = {**message, "content": content}
+                    elided += 1
+        return elided
+
+    def compact(self, messages: list[dict]) -> list[dict]:
+        messages = list(messages)
+        turn_starts = [index for index, message in enumerate(messages) if message["role"] == "user"]
+        if not turn_starts:
+            return messages
+
+        # Old turns keep their questions and answers but lose bulky result rows
+        if len(turn_starts) > self.keep_turns:
+            boundary = turn_starts[-self.keep_turns] if self.keep_turns else len(messages)
+            self._elide(messages, 0, boundary)
+
+        dropped = 0
+        while self.count(messages) > self.max_tokens and len(turn_starts) > 1:
+            start, end = turn_starts[0], turn_starts[1]
+            del messages[start:end]
+            turn_starts = [index - (end - start) for index in turn_starts[1:]]
+            dropped += 1
+
+        if self.count(messages) > self.max_tokens:
+            # A single oversized turn: trim every result except the latest round of tool calls
+            last_call = max(
+                (index for index, message in enumerate(messages) if message.get("tool_calls")),
+                default=len(messages)
+            )
+            self._elide(messages, 0, last_call)
+
+        if dropped:
+            logger.info(f"Dropped {dropped} oldest turns to stay under {self.max_tokens} tokens")
+
+        live = {id(message) for message in messages}
+        self._token_counts = {key: value for key, value in self._token_counts.items() if key in live}
+        return messages
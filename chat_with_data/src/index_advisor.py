@@ -0,0 +1,283 @@
+import os
+import re
+import json
+import time
+import atexit
+import sqlite3
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+
+from src.query_guard import TABLE_REFERENCE_PATTERN
+from src.result_cache import normalize_sql
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("ChatWithData.IndexAdvisor")
+
+QUERY_LOG_PATH = os.environ.get("QUERY_LOG_PATH", "logs/query_log.jsonl")
+MAX_LOGGED_QUERIES = 500
+# Log lines are written in batches by a background thread, not once per query
+QUERY_LOG_FLUSH_ROWS = 100
+QUERY_LOG_FLUSH_SECONDS = 5.0
+MAX_INDEX_COLUMNS = 5
+
+PLAN_SCAN_PATTERN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?(.*)$', re.IGNORECASE)
+COLUMN_REFERENCE_PATTERN = re.compile(r'\b(?:(\w+)\.)?(\w+)\b')
+PREDICATE_PATTERN = re.compile(
+    r'\b(?:(\w+)\.)?(\w+)\s*(=|<>|!=|<=|>=|<|>|\bIN\b|\bBETWEEN\b|\bLIKE\b)',
+    re.IGNORECASE
+)
+CLAUSE_PATTERN = re.compile(
+    r'\b(WHERE|GROUP\s+BY|ORDER\s+BY|HAVING|LIMIT|ON)\b',
+    re.IGNORECASE
+)
+
+
+class QueryLog:
+
+    def __init__(
+        self,
+        path: str = QUERY_LOG_PATH,
+        max_queries: int = MAX_LOGGED_QUERIES,
+        flush_rows: int = QUERY_LOG_FLUSH_ROWS,
+        flush_seconds: float = QUERY_LOG_FLUSH_SECONDS
+    ):
+        self.path = path
+        self.max_queries = max_queries
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self._queries = OrderedDict()
+        self._pending = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flusher = None
+
+    def record(self, query: str, elapsed_ms: float, row_count: int) -> None:
+        key = normalize_sql(query)
+        with self._lock:
+            entry = self._queries.pop(key, None) or {"query": query, "count": 0, "total_ms": 0.0}
+            entry["count"] += 1
+            entry["total_ms"] += elapsed_ms
+            self._queries[key] = entry
+            while len(self._queries) > self.max_queries:
+                self._queries.popitem(last=False)
+
+            if not self.path:
+                return
+            self._pending.append(json.dumps({
+                "ts": time.time(),
+                "query": query,
+                "elapsed_ms": round(elapsed_ms, 3),
+                "rows": row_count
+            }) + "\n")
+            full = len(self._pending) >= self.flush_rows
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+                self._flusher.start()
+                atexit.register(self.flush)
+
+        if full:
+            self._wake.set()
+
+    def _flush_loop(self) -> None:
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        # Taken before the swap so batches reach the file in order, even if the exit handler
+        # races the background thread; record() only ever waits for the swap itself
+        with self._write_lock:
+            with self._lock:
+                lines, self._pending = self._pending, []
+            if not lines:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.writelines(lines)
+            except OSError as e:
+                logger.warning(f"Could not write query log: {str(e)}")
+
+    def entries(self) -> list[dict]:
+        with self._lock:
+            return [dict(entry) for entry in self._queries.values()]
+
+    @staticmethod
+    def load(path: str = QUERY_LOG_PATH) -> list[dict]:
+        aggregated = OrderedDict()
+        if not os.path.exists(path):
+            return []
+
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                key = normalize_sql(record["query"])
+                entry = aggregated.setdefault(key, {"query": record["query"], "count": 0, "total_ms": 0.0})
+                entry["count"] += 1
+                entry["total_ms"] += record.get("elapsed_ms", 0.0)
+
+        return list(aggregated.values())
+
+
+def _clause_text(query: str, clause: str) -> str:
+    # Text of every occurrence of a clause, up to the next clause keyword
+    parts = []
+    matches = list(CLAUSE_PATTERN.finditer(query))
+    for i, match in enumerate(matches):
+        if re.sub(r'\s+', ' ', match.group(1).upper()) == clause:
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(query)
+            parts.append(query[match.end():end])
+    return " ".join(parts)
+
+
+def _resolve_column(qualifier, column, aliases: dict, table_columns: dict):
+    column = column.lower()
+    if qualifier:
+        table = aliases.get(qualifier.lower())
+        if table and column in table_columns[table]:
+            return table, column
+        return None
+    owners = [table for table in set(aliases.values()) if column in table_columns[table]]
+    return (owners[0], column) if len(owners) == 1 else None
+
+
+def _existing_index_prefixes(conn: sqlite3.Connection, table: str) -> list[list[str]]:
+    prefixes = []
+    for index in conn.execute(f'PRAGMA index_list("{table}")').fetchall():
+        columns = [row[2].lower() for row in conn.execute(f'PRAGMA index_info("{index[1]}")').fetchall() if row[2]]
+        prefixes.append(columns)
+    return prefixes
+
+
+def suggest_indexes(conn: sqlite3.Connection, queries: list[dict]) -> list[dict]:
+    table_columns = {}
+    rowid_columns = {}
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"):
+        info = conn.execute(f'PRAGMA table_info("{name}")').fetchall()
+        table_columns[name] = {row[1].lower() for row in info}
+        # An INTEGER PRIMARY KEY is the rowid, which every index already carries
+        rowid_columns[name] = {row[1].lower() for row in info if row[5] == 1 and row[2].upper() == "INTEGER"}
+    lower_tables = {name.lower(): name for name in table_columns}
+
+    suggestions = OrderedDict()
+
+    for entry in queries:
+        query = entry["query"]
+        try:
+            plan = conn.execute(f"EXPLAIN QUERY PLAN {query}").fetchall()
+        except sqlite3.Error:
+            continue
+
+        aliases = {}
+        for table, alias in TABLE_REFERENCE_PATTERN.findall(query):
+            if table.lower() in lower_tables:
+                aliases[table.lower()] = lower_tables[table.lower()]
+                if alias and alias.upper() not in ("WHERE", "JOIN", "ON", "GROUP", "ORDER", "LIMIT", "LEFT", "INNER"):
+                    aliases[alias.lower()] = lower_tables[table.lower()]
+
+        scanned = set()
+        for row in plan:
+            match = PLAN_SCAN_PATTERN.match(row[3])
+            if match and "COVERING INDEX" not in match.group(2).upper():
+                table = aliases.get(match.group(1).lower()) or lower_tables.get(match.group(1).lower())
+                if table:
+                    scanned.add(table)
+
+        for table in scanned:
+            equality, ranges, grouping, referenced = [], [], [], []
+
+            for qualifier, column, operator in PREDICATE_PATTERN.findall(_clause_text(query, "WHERE")):
+                resolved = _resolve_column(qualifier, column, aliases, table_columns)
+                if resolved and resolved[0] == table:
+                    target = equality if operator.strip().upper() in ("=", "IN") else ranges
+                    if resolved[1] not in target:
+                        target.append(resolved[1])
+
+            for clause in ("GROUP BY", "ORDER BY"):
+                for qualifier, column in COLUMN_REFERENCE_PATTERN.findall(_clause_text(query, clause)):
+                    resolved = _resolve_column(qualifier, column, aliases, table_columns)
+                    if resolved and resolved[0] == table and resolved[1] not in grouping:
+                        grouping.append(resolved[1])
+
+            for qualifier, column in COLUMN_REFERENCE_PATTERN.findall(query):
+                resolved = _resolve_column(qualifier, column, aliases, table_columns)
+                if resolved and resolved[0] == table and resolved[1] not in referenced:
+                    referenced.append(resolved[1])
+
+            # Equality columns first, then one range column, then grouping/ordering columns
+            columns = equality + ranges[:1] + [c for c in grouping if c not in equality and c not in ranges[:1]]
+            columns = [c for c in columns if c not in rowid_columns[table]]
+            if not columns:
+                continue
+
+            extra = [c for c in referenced if c not in columns and c not in rowid_columns[table]]
+            if len(columns) + len(extra) <= MAX_INDEX_COLUMNS:
+                columns += extra
+                reason = "covering index for filtered/grouped scan"
+            else:
+                reason = "index for filtered/grouped scan"
+            columns = columns[:MAX_INDEX_COLUMNS]
+
+            if any(prefix[:len(columns)] == columns for prefix in _existing_index_prefixes(conn, table)):
+                continue
+
+            name = f"idx_{table}_{'_'.join(columns)}"
+            suggestion = suggestions.setdefault(name, {
+                "table": table,
+                "columns": columns,
+                "sql": f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})",
+                "reason": reason,
+                "queries": 0,
+                "total_ms": 0.0
+            })
+            suggestion["queries"] += entry.get("count", 1)
+            suggestion["total_ms"] += entry.get("total_ms", 0.0)
+
+    return sorted(suggestions.values(), key=lambda s: s["total_ms"], reverse=True)
+
+
+query_log = QueryLog()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suggest indexes for queries executed by the agent")
+    parser.add_argument("--db", default="data/ecommerce.db")
+    parser.add_argument("--log", default=QUERY_LOG_PATH)
+    parser.add_argument("--create-indexes", action="store_true",
+                        help="Create the standard index set from database_setup on this database")
+    args = parser.parse_args()
+
+    if args.create_indexes:
+        from src.database_setup import create_indexes
+        conn = sqlite3.connect(args.db)
+        create_indexes(conn)
+        conn.close()
+
+    queries = QueryLog.load(args.log)
+    print(f"Analyzing {len(queries)} distinct logged queries from {args.log}")
+
+    conn = sqlite3.connect(f"file:{os.path.abspath(args.db)}?mode=ro", uri=True)
+    suggestions = suggest_indexes(conn, queries)
+    conn.close()
+
+    if not suggestions:
+        print("No index suggestions - logged queries already use indexes.")
+        return
+
+    for suggestion in suggestions:
+        print(f"\n{suggestion['sql']};")
+        print(f"  -- {suggestion['reason']}; {suggestion['queries']} executions, {suggestion['total_ms']:.1f} ms total")
+
+
+if __name__ == "__main__":
+    main()
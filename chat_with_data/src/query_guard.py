@@ -0,0 +1,160 @@
+import re
+import time
+import sqlite3
+import logging
+import threading
+from typing import Optional
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("ChatWithData.Guard")
+
+QUERY_TIMEOUT_SECONDS = 5.0
+MAX_VM_INSTRUCTIONS = 50_000_000
+FULL_SCAN_ROW_LIMIT = 1_000_000
+PROGRESS_HANDLER_INTERVAL = 10_000
+TABLE_SIZE_TTL_SECONDS = 60.0
+
+SCAN_PATTERN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?', re.IGNORECASE)
+TABLE_REFERENCE_PATTERN = re.compile(
+    r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?',
+    re.IGNORECASE
+)
+
+GUARD_HINTS = {
+    "timeout": "The query ran longer than the time limit. Add selective WHERE filters, avoid cross joins, or aggregate fewer rows.",
+    "instruction_limit": "The query did too much work. Add selective WHERE filters, join on key columns, or reduce the rows being aggregated.",
+    "full_scan": "The query would scan a very large table. Filter on an indexed column (e.g. a primary key, customer_id, order_id, or order_date range).",
+    "cancelled": "The query was cancelled before it finished."
+}
+
+_table_sizes = {}
+_table_sizes_lock = threading.Lock()
+
+
+class QueryGuard:
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        timeout: float = QUERY_TIMEOUT_SECONDS,
+        max_instructions: int = MAX_VM_INSTRUCTIONS,
+        interval: int = PROGRESS_HANDLER_INTERVAL
+    ):
+        self.conn = conn
+        self.timeout = timeout
+        self.max_instructions = max_instructions
+        self.interval = interval
+        self.fired: Optional[str] = None
+        self.instructions = 0
+        self._deadline = 0.0
+        self._watchdog: Optional[threading.Timer] = None
+
+    def _on_progress(self) -> int:
+        self.instructions += self.interval
+        if self.fired:
+            return 1
+        if self.max_instructions and self.instructions > self.max_instructions:
+            self.fired = "instruction_limit"
+            return 1
+        if self.timeout and time.monotonic() > self._deadline:
+            self.fired = "timeout"
+            return 1
+        return 0
+
+    def _on_watchdog(self) -> None:
+        # Covers long single steps where the progress handler is not called often enough
+        if not self.fired:
+            self.fired = "timeout"
+        self.conn.interrupt()
+
+    def cancel(self) -> None:
+        if not self.fired:
+            self.fired = "cancelled"
+        self.conn.interrupt()
+
+    def __enter__(self):
+        self._deadline = time.monotonic() + (self.timeout or 0)
+        self.conn.set_progress_handler(self._on_progress, self.interval)
+        if self.timeout:
+            self._watchdog = threading.Timer(self.timeout * 1.5, self._on_watchdog)
+            self._watchdog.daemon = True
+            self._watchdog.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._watchdog:
+            self._watchdog.cancel()
+        # Pooled connections must not carry the handler into the next query
+        self.conn.set_progress_handler(None, 0)
+        return False
+
+    def error_message(self) -> str:
+        if self.fired == "timeout":
+            return f"Query exceeded the {self.timeout:g}s time limit and was stopped."
+        if self.fired == "instruction_limit":
+            return f"Query exceeded the work budget of {self.max_instructions:,} VM instructions and was stopped."
+        return "Query was cancelled."
+
+
+def _estimate_table_size(conn: sqlite3.Connection, db_key: str, table: str) -> int:
+    key = (db_key, table)
+    now = time.monotonic()
+    with _table_sizes_lock:
+        cached = _table_sizes.get(key)
+    if cached and now - cached[1] < TABLE_SIZE_TTL_SECONDS:
+        return cached[0]
+
+    try:
+        # MAX(rowid) is answered from the b-tree edge, unlike COUNT(*)
+        size = conn.execute(f'SELECT MAX(rowid) FROM "{table}"').fetchone()[0] or 0
+    except sqlite3.Error:
+        size = 0
+
+    with _table_sizes_lock:
+        _table_sizes[key] = (size, now)
+    return size
+
+
+def check_query_plan(
+    conn: sqlite3.Connection,
+    query: str,
+    db_key: str,
+    max_scan_rows: int = FULL_SCAN_ROW_LIMIT
+) -> Optional[str]:
+    if not max_scan_rows:
+        return None
+
+    tables = {
+        row[0].lower(): row[0]
+        for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
+    }
+    aliases = {}
+    for table, alias in TABLE_REFERENCE_PATTERN.findall(query):
+        if table.lower() in tables:
+            aliases[table.lower()] = tables[table.lower()]
+            if alias:
+                aliases[alias.lower()] = tables[table.lower()]
+
+    for row in conn.execute(f"EXPLAIN QUERY PLAN {query}"):
+        match = SCAN_PATTERN.match(row[3])
+        # An index-only scan reads the narrow index, not the table rows this guard protects
+        if not match or "COVERING INDEX" in row[3].upper():
+            continue
+
+        name = match.group(1).lower()
+        table = tables.get(name) or aliases.get(name)
+        if not table:
+            continue
+
+        size = _estimate_table_size(conn, db_key, table)
+        if size > max_scan_rows:
+            logger.warning(f"BLOCKED: Full scan of {table} (~{size:,} rows) exceeds limit of {max_scan_rows:,}")
+            return (
+                f"Query plan performs a full scan of table '{table}' (~{size:,} rows), "
+                f"which exceeds the limit of {max_scan_rows:,} rows."
+            )
+
+    return None
@@ -0,0 +1,102 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from src.sql_validator import tokenize
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("ChatWithData.Cache")
+
+DEFAULT_MAX_ENTRIES = 256
+
+
+def normalize_sql(query: str) -> str:
+    # String literals and quoted identifiers are kept verbatim; everything else is case-folded
+    tokens = [
+        token.text if token.kind in ("string", "identifier", "param") else token.text.lower()
+        for token in tokenize(query)
+    ]
+
+    # Joining tokens with single spaces makes the key independent of the original layout
+    while tokens and tokens[-1] == ";":
+        tokens.pop()
+    return " ".join(tokens)
+
+
+def data_version(db_path: str) -> tuple:
+    # PRAGMA data_version is per connection and differs across pooled connections,
+    # so the database and WAL file stats serve as the shared version stamp
+    # An empty WAL (recreated when a reader opens the database) holds no data and counts as absent
+    version = []
+    for path in (db_path, f"{db_path}-wal"):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stat = None
+        if stat and stat.st_size:
+            version.extend([stat.st_mtime_ns, stat.st_size])
+        else:
+            version.extend([0, 0])
+    return tuple(version)
+
+
+class QueryResultCache:
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def make_key(self, db_path: str, query: str, *params) -> tuple:
+        return (os.path.abspath(db_path), normalize_sql(query), params)
+
+    def get(self, key: tuple, version: tuple) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if entry[0] != version:
+                del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, version: tuple, result: dict) -> None:
+        with self._lock:
+            self._entries[key] = (version, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+query_cache = QueryResultCache()
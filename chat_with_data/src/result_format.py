@@ -0,0 +1,129 @@
+import io
+import csv
+import json
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Bookkeeping fields the UI uses but the model does not need
+HIDDEN_KEYS = {"cached", "engine", "limit_applied", "truncated"}
+TABLE_FORMATS = ("csv", "markdown")
+
+# Per model, including failed lookups (False) so offline hosts do not retry the download
+_encodings = {}
+
+
+def token_encoding(model: str = "gpt-4o-mini"):
+    if tiktoken is None:
+        return None
+    if model not in _encodings:
+        try:
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encodings[model] = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            # Encodings are downloaded on first use; offline hosts fall back to estimates
+            _encodings[model] = False
+    return _encodings[model] or None
+
+
+def count_tokens(text: str, encoding=None) -> int:
+    if not text:
+        return 0
+    if encoding is None:
+        encoding = token_encoding() or False
+    if not encoding:
+        # Roughly four characters per token for English and SQL
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+
+def _round_value(value):
+    if isinstance(value, float):
+        # Cents for amounts, four significant digits for small ratios
+        return round(value, 2) if abs(value) >= 1 else float(f"{value:.4g}")
+    return value
+
+
+def _cell(value) -> str:
+    if value is None:
+        return "NULL"
+    return str(value)
+
+
+def _to_csv(columns: list, rows: list) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    writer.writerows([[_cell(value) for value in row] for row in rows])
+    return buffer.getvalue().rstrip("\n")
+
+
+def _to_markdown(columns: list, rows: list) -> str:
+    lines = ["| " + " | ".join(str(column) for column in columns) + " |"]
+    lines.append("|" + "---|" * len(columns))
+    for row in rows:
+        lines.append("| " + " | ".join(_cell(value).replace("|", "\\|") for value in row) + " |")
+    return "\n".join(lines)
+
+
+def encode_result(result: dict) -> str:
+    meta = {
+        key: value for key, value in result.items()
+        if key not in HIDDEN_KEYS and key not in ("data", "columns") and value is not None
+    }
+
+    data = result.get("data")
+    columns = result.get("columns")
+    if not result.get("success") or not columns or data is None:
+        return json.dumps({**meta, "columns": columns} if columns else meta, separators=(",", ":"), default=str)
+
+    rows = [[_round_value(value) for value in row] for row in data]
+
+    # Columns holding a single value in every row are stated once instead of per row
+    constant = {}
+    if len(rows) > 1:
+        for index, column in enumerate(columns):
+            values = {json.dumps(row[index], default=str) for row in rows}
+            if len(values) == 1:
+                constant[column] = rows[0][index]
+        if len(constant) == len(columns):
+            constant = {}
+    if constant:
+        meta["constant_columns"] = constant
+        keep = [index for index, column in enumerate(columns) if column not in constant]
+        columns = [columns[index] for index in keep]
+        rows = [[row[index] for index in keep] for row in rows]
+
+    candidates = {
+        "json": json.dumps({**meta, "columns": columns, "data": rows}, separators=(",", ":"), default=str)
+    }
+    for table_format in TABLE_FORMATS:
+        header = json.dumps({**meta, "format": table_format}, separators=(",", ":"), default=str)
+        table = _to_csv(columns, rows) if table_format == "csv" else _to_markdown(columns, rows)
+        candidates[table_format] = f"{header}\n{table}"
+
+    return min(candidates.values(), key=count_tokens)
+
+
+def split_encoded(content: str) -> tuple[dict, list]:
+    # Returns (metadata, table lines); table lines are empty for JSON-encoded results
+    header, _, table = content.partition("\n")
+    meta = json.loads(header)
+    if not isinstance(meta, dict) or meta.get("format") not in TABLE_FORMATS:
+        return json.loads(content), []
+    return meta, table.split("\n") if table else []
+
+
+def summarize_result(result: dict) -> str:
+    if not result.get("success"):
+        return f"error: {result.get('error')}"
+    if result.get("columns") is not None:
+        more = ", more available" if result.get("more_rows_available") else ""
+        return f"{result.get('row_count', 0)} rows x {len(result['columns'])} columns{more}"
+    if result.get("schema") is not None:
+        return f"schema with {len(result['schema'])} tables"
+    return "ok"
@@ -0,0 +1,233 @@
+import os
+import logging
+import sqlite3
+import threading
+
+from src.connection_pool import get_connection_pool
+from src.result_cache import data_version
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("ChatWithData.Schema")
+
+LOW_CARDINALITY_LIMIT = 8
+SAMPLE_SCAN_ROWS = 5000
+DATE_TYPES = ("DATE", "TIME")
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _table_structure(cursor: sqlite3.Cursor, table: str) -> dict:
+    cursor.execute(f"PRAGMA table_info({_quote(table)})")
+    columns = [
+        {
+            "name": col[1],
+            "type": col[2],
+            "nullable": not col[3],
+            "primary_key": bool(col[5])
+        }
+        for col in cursor.fetchall()
+    ]
+
+    indexes = []
+    cursor.execute(f"PRAGMA index_list({_quote(table)})")
+    for index in cursor.fetchall():
+        index_name, unique, origin = index[1], bool(index[2]), index[3]
+        cursor.execute(f"PRAGMA index_info({_quote(index_name)})")
+        indexes.append({
+            "name": index_name,
+            "columns": [col[2] for col in cursor.fetchall()],
+            "unique": unique,
+            "origin": origin
+        })
+
+    cursor.execute(f"PRAGMA foreign_key_list({_quote(table)})")
+    foreign_keys = [
+        {
+            "column": fk[3],
+            "references_table": fk[2],
+            "references_column": fk[4]
+        }
+        for fk in cursor.fetchall()
+    ]
+
+    return {
+        "columns": columns,
+        "indexes": indexes,
+        "foreign_keys": foreign_keys
+    }
+
+
+def _approximate_row_counts(cursor: sqlite3.Cursor, tables: list[str]) -> dict:
+    counts = {}
+
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='sqlite_stat1'")
+    if cursor.fetchone():
+        # After ANALYZE, the first number of each stat row is the table's row count
+        cursor.execute("SELECT tbl, stat FROM sqlite_stat1")
+        for table, stat in cursor.fetchall():
+            try:
+                counts[table] = max(counts.get(table, 0), int(str(stat).split()[0]))
+            except (ValueError, IndexError):
+                continue
+
+    for table in tables:
+        if table not in counts:
+            try:
+                # MAX(rowid) reads one b-tree edge; it overestimates only after deletes
+                cursor.execute(f"SELECT MAX(rowid) FROM {_quote(table)}")
+                counts[table] = cursor.fetchone()[0] or 0
+            except sqlite3.Error:
+                cursor.execute(f"SELECT COUNT(*) FROM {_quote(table)}")
+                counts[table] = cursor.fetchone()[0]
+
+    return counts
+
+
+def _exact_row_counts(cursor: sqlite3.Cursor, tables: list[str]) -> dict:
+    counts = {}
+    for table in tables:
+        cursor.execute(f"SELECT COUNT(*) FROM {_quote(table)}")
+        counts[table] = cursor.fetchone()[0]
+    return counts
+
+
+def _column_samples(cursor: sqlite3.Cursor, table: str, column: dict) -> str:
+    name = _quote(column["name"])
+    declared = (column["type"] or "").upper()
+
+    if any(date_type in declared for date_type in DATE_TYPES):
+        cursor.execute(f"SELECT {name} FROM {_quote(table)} WHERE {name} IS NOT NULL LIMIT 1")
+        row = cursor.fetchone()
+        return f" e.g. {row[0]!r}" if row else ""
+
+    if "CHAR" not in declared and "TEXT" not in declared:
+        return ""
+
+    # Only a bounded prefix of the table is sampled, so this stays cheap on large tables.
+    # NOT INDEXED keeps rowid order; a covering index would return one value's rows first.
+    cursor.execute(
+        f"SELECT {name}, COUNT(*) FROM (SELECT {name} FROM {_quote(table)} NOT INDEXED LIMIT {SAMPLE_SCAN_ROWS}) "
+        f"WHERE {name} IS NOT NULL GROUP BY {name} LIMIT {LOW_CARDINALITY_LIMIT + 1}"
+    )
+    values = cursor.fetchall()
+    sampled = sum(count for _, count in values)
+    if not values or len(values) > LOW_CARDINALITY_LIMIT or sampled < 4 * len(values):
+        return ""
+    return " {" + ", ".join(repr(value) for value, _ in sorted(values)) + "}"
+
+
+def build_schema_digest(cursor: sqlite3.Cursor, tables: dict) -> str:
+    lines = []
+    for table, info in tables.items():
+        references = {fk["column"]: f"{fk['references_table']}.{fk['references_column']}" for fk in info["foreign_keys"]}
+        columns = []
+        for column in info["columns"]:
+            text = f"{column['name']} {column['type']}"
+            if column["primary_key"]:
+                text += " PK"
+            if column["name"] in references:
+                text += f" -> {references[column['name']]}"
+            columns.append(text + _column_samples(cursor, table, column))
+        lines.append(f"- {table}: " + ", ".join(columns))
+
+        indexed = [
+            "(" + ", ".join(index["columns"]) + ")"
+            for index in info["indexes"] if index["origin"] == "c"
+        ]
+        if indexed:
+            lines.append(f"  indexed on: {', '.join(indexed)}")
+
+    return "\n".join(lines)
+
+
+class SchemaCache:
+
+    def __init__(self):
+        self._structures = {}
+        self._counts = {}
+        self._digests = {}
+        self._lock = threading.Lock()
+
+    def get_schema(self, db_path: str, exact_counts: bool = False) -> dict:
+        key = os.path.abspath(db_path)
+        version = data_version(db_path)
+
+        with get_connection_pool(db_path).connection() as conn:
+            cursor = conn.cursor()
+            schema_version = cursor.execute("PRAGMA schema_version").fetchone()[0]
+
+            with self._lock:
+                structure = self._structures.get(key)
+            cached = structure is not None and structure[0] == schema_version
+
+            if cached:
+                tables = structure[1]
+            else:
+                cursor.execute(
+                    "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+                )
+                table_names = [row[0] for row in cursor.fetchall()]
+                tables = {table: _table_structure(cursor, table) for table in table_names}
+                with self._lock:
+                    self._structures[key] = (schema_version, tables)
+                logger.info(f"Schema structure refreshed (schema_version={schema_version})")
+
+            # Row counts follow the data, not the schema, so they are refreshed on their own
+            count_key = (key, exact_counts)
+            with self._lock:
+                counts = self._counts.get(count_key)
+            if counts is None or counts[0] != (schema_version, version):
+                if exact_counts:
+                    row_counts = _exact_row_counts(cursor, list(tables))
+                else:
+                    row_counts = _approximate_row_counts(cursor, list(tables))
+                counts = ((schema_version, version), row_counts)
+                with self._lock:
+                    self._counts[count_key] = counts
+
+        schema = {
+            table: {
+                **info,
+                "row_count": counts[1].get(table, 0),
+                "row_count_exact": exact_counts
+            }
+            for table, info in tables.items()
+        }
+
+        return {
+            "schema": schema,
+            "schema_version": schema_version,
+            "cached": cached
+        }
+
+    def get_digest(self, db_path: str) -> tuple[int, str]:
+        # Depends only on the schema, so the prompt built from it stays byte-identical between changes
+        key = os.path.abspath(db_path)
+        result = self.get_schema(db_path)
+        schema_version = result["schema_version"]
+
+        with self._lock:
+            digest = self._digests.get(key)
+        if digest is not None and digest[0] == schema_version:
+            return digest
+
+        with get_connection_pool(db_path).connection() as conn:
+            digest = (schema_version, build_schema_digest(conn.cursor(), result["schema"]))
+        with self._lock:
+            self._digests[key] = digest
+        logger.info(f"Schema digest rebuilt (schema_version={schema_version})")
+        return digest
+
+    def clear(self) -> None:
+        with self._lock:
+            self._structures.clear()
+            self._counts.clear()
+            self._digests.clear()
+
+
+schema_cache = SchemaCache()
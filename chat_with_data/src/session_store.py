@@ -0,0 +1,180 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import logging
+import weakref
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Optional
+
+from src.agent import DataAgent, shared_client
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("ChatWithData.Sessions")
+
+SESSION_DB_PATH = os.environ.get("SESSION_DB_PATH", "data/sessions.db")
+SESSION_CACHE_SIZE = int(os.environ.get("SESSION_CACHE_SIZE", "64"))
+SESSION_TTL_DAYS = float(os.environ.get("SESSION_TTL_DAYS", "30"))
+
+
+def encode_state(state: dict) -> bytes:
+    return zlib.compress(json.dumps(state, separators=(",", ":"), default=str).encode("utf-8"))
+
+
+def decode_state(blob: bytes) -> dict:
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class SessionStore:
+
+    def __init__(
+        self,
+        path: str = SESSION_DB_PATH,
+        cache_size: int = SESSION_CACHE_SIZE,
+        ttl_days: float = SESSION_TTL_DAYS
+    ):
+        self.path = path
+        self.cache_size = cache_size
+        self.ttl_days = ttl_days
+        self._hot = OrderedDict()
+        self._lock = threading.Lock()
+        # Dropped automatically once no turn holds them
+        self._session_locks = weakref.WeakValueDictionary()
+        self._conn = None
+        self.hits = 0
+        self.loads = 0
+        self.created = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened lazily so importing the module does not create the database file
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    state BLOB NOT NULL,
+                    version INTEGER NOT NULL DEFAULT 1,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            if self.ttl_days:
+                conn.execute("DELETE FROM sessions WHERE updated_at < ?", (time.time() - self.ttl_days * 86400,))
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @contextmanager
+    def lock(self, session_id: str):
+        # Two tabs on the same session URL share one cached agent, so their turns (get, chat, save)
+        # run one at a time. The lock is per process; replicas rely on the version check in get().
+        with self._lock:
+            lock = self._session_locks.get(session_id)
+            if lock is None:
+                lock = threading.Lock()
+                self._session_locks[session_id] = lock
+        with lock:
+            yield
+
+    def _stored_version(self, session_id: str) -> Optional[int]:
+        row = self._connection().execute(
+            "SELECT version FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def get(
+        self,
+        session_id: str,
+        api_key: str,
+        model: str = "gpt-4o-mini",
+        config: Optional[dict] = None,
+        agent_class: type = DataAgent
+    ) -> DataAgent:
+        config = {**(config or {}), "session_id": session_id}
+
+        with self._lock:
+            stored_version = self._stored_version(session_id)
+            hot = self._hot.get(session_id)
+
+            # Another worker may have advanced the session since it was cached here
+            if hot is not None and hot[0] == stored_version and isinstance(hot[1], agent_class):
+                self._hot.move_to_end(session_id)
+                self.hits += 1
+                agent = hot[1]
+                agent.config = config
+                return agent
+
+            client = shared_client(agent_class.client_class, api_key)
+            if stored_version is not None:
+                row = self._connection().execute(
+                    "SELECT state, version FROM sessions WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                agent = agent_class.from_state(decode_state(row[0]), api_key, config=config, client=client)
+                stored_version = row[1]
+                self.loads += 1
+                logger.info(f"Session {session_id} rehydrated ({len(agent.conversation_history)} messages)")
+            else:
+                agent = agent_class(api_key=api_key, model=model, config=config, client=client)
+                self.created += 1
+
+            self._remember(session_id, stored_version, agent)
+            return agent
+
+    def _remember(self, session_id: str, version: Optional[int], agent: DataAgent) -> None:
+        self._hot[session_id] = (version, agent)
+        self._hot.move_to_end(session_id)
+        while len(self._hot) > self.cache_size:
+            # Evicted sessions are already persisted and are reloaded on their next request
+            self._hot.popitem(last=False)
+
+    def save(self, agent: DataAgent) -> None:
+        blob = encode_state(agent.to_state())
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                """
+                INSERT INTO sessions (session_id, model, state, version, updated_at) VALUES (?, ?, ?, 1, ?)
+                ON CONFLICT(session_id) DO UPDATE SET
+                    model = excluded.model,
+                    state = excluded.state,
+                    version = sessions.version + 1,
+                    updated_at = excluded.updated_at
+                """,
+                (agent.session_id, agent.model, blob, time.time())
+            )
+            conn.commit()
+            self._remember(agent.session_id, self._stored_version(agent.session_id), agent)
+        logger.info(f"Session {agent.session_id} saved ({len(blob):,} bytes)")
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._hot.pop(session_id, None)
+            conn = self._connection()
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stored, stored_bytes = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(state)), 0) FROM sessions"
+            ).fetchone()
+            return {
+                "hot": len(self._hot),
+                "stored": stored,
+                "stored_bytes": stored_bytes,
+                "hits": self.hits,
+                "loads": self.loads,
+                "created": self.created
+            }
+
+
+session_store = SessionStore()
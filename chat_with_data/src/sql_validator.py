@@ -0,0 +1,173 @@
+import re
+import sqlite3
+
+DANGEROUS_KEYWORDS = [
+    "DROP", "DELETE", "TRUNCATE", "ALTER", "CREATE", "INSERT", "UPDATE",
+    "REPLACE", "RENAME", "GRANT", "REVOKE", "COMMIT", "ROLLBACK",
+    "ATTACH", "DETACH", "VACUUM", "REINDEX", "PRAGMA", "ANALYZE",
+    "BEGIN", "END", "SAVEPOINT", "RELEASE"
+]
+
+# Functions that can touch the filesystem or load code when they are compiled in
+BLOCKED_FUNCTIONS = {"load_extension", "readfile", "writefile", "edit", "fts3_tokenizer"}
+
+ALLOWED_AUTHORIZER_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION}
+if hasattr(sqlite3, "SQLITE_RECURSIVE"):
+    ALLOWED_AUTHORIZER_ACTIONS.add(sqlite3.SQLITE_RECURSIVE)
+
+TOKEN_PATTERN = re.compile(
+    r"(?P<space>\s+)"
+    r"|(?P<comment>--[^\n]*|/\*.*?(?:\*/|\Z))"
+    r"|(?P<string>'(?:[^']|'')*(?:'|\Z))"
+    r'|(?P<identifier>"(?:[^"]|"")*(?:"|\Z)|`(?:[^`]|``)*(?:`|\Z)|\[[^\]]*(?:\]|\Z))'
+    r"|(?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)"
+    r"|(?P<word>[A-Za-z_][\w$]*)"
+    r"|(?P<param>[?:@$]\w*)"
+    r"|(?P<symbol>\|\||<<|>>|<=|>=|==|!=|<>|[^\s\w])",
+    re.DOTALL
+)
+
+
+class Token:
+    __slots__ = ("kind", "text", "start", "end")
+
+    def __init__(self, kind: str, text: str, start: int, end: int):
+        self.kind = kind
+        self.text = text
+        self.start = start
+        self.end = end
+
+    @property
+    def upper(self) -> str:
+        return self.text.upper() if self.kind == "word" else ""
+
+
+def tokenize(query: str, keep_comments: bool = False) -> list[Token]:
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(query):
+        kind = match.lastgroup
+        if kind == "space" or (kind == "comment" and not keep_comments):
+            continue
+        tokens.append(Token(kind, match.group(), match.start(), match.end()))
+    return tokens
+
+
+def strip_comments(query: str) -> str:
+    # Literal-aware, so '--' or '/*' inside a string is left alone
+    parts = []
+    position = 0
+    for token in tokenize(query, keep_comments=True):
+        if token.kind == "comment":
+            parts.append(query[position:token.start])
+            parts.append(" ")
+            position = token.end
+    parts.append(query[position:])
+    return "".join(parts).strip()
+
+
+def _is_unterminated(token: Token) -> bool:
+    text = token.text
+    if token.kind == "string":
+        return len(text) < 2 or not text.endswith("'") or text.count("'") % 2
+    if token.kind == "identifier":
+        closing = {'"': '"', "`": "`", "[": "]"}[text[0]]
+        if len(text) < 2 or not text.endswith(closing):
+            return True
+        return closing != "]" and text.count(closing) % 2
+    return False
+
+
+def _skip_group(tokens: list[Token], index: int) -> int:
+    # tokens[index] is "(", returns the index just past its matching ")"
+    depth = 0
+    for i in range(index, len(tokens)):
+        if tokens[i].text == "(":
+            depth += 1
+        elif tokens[i].text == ")":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return len(tokens)
+
+
+def _skip_with_clause(tokens: list[Token], index: int) -> int:
+    # WITH [RECURSIVE] name [(columns)] AS [[NOT] MATERIALIZED] (select) [, ...]
+    index += 1
+    if index < len(tokens) and tokens[index].upper == "RECURSIVE":
+        index += 1
+
+    while index < len(tokens):
+        if tokens[index].kind not in ("word", "identifier"):
+            return -1
+        index += 1
+        if index < len(tokens) and tokens[index].text == "(":
+            index = _skip_group(tokens, index)
+        if index >= len(tokens) or tokens[index].upper != "AS":
+            return -1
+        index += 1
+        if index < len(tokens) and tokens[index].upper == "NOT":
+            index += 1
+        if index < len(tokens) and tokens[index].upper == "MATERIALIZED":
+            index += 1
+        if index >= len(tokens) or tokens[index].text != "(":
+            return -1
+        index = _skip_group(tokens, index)
+        if index < len(tokens) and tokens[index].text == ",":
+            index += 1
+            continue
+        return index
+
+    return -1
+
+
+def validate_query(query: str) -> tuple[bool, str]:
+    tokens = tokenize(query)
+
+    for token in tokens:
+        if _is_unterminated(token):
+            return False, "Query contains an unterminated string or identifier."
+
+    statements = [[]]
+    for token in tokens:
+        if token.text == ";":
+            statements.append([])
+        else:
+            statements[-1].append(token)
+    statements = [statement for statement in statements if statement]
+
+    if not statements:
+        return False, "Only SELECT queries are allowed. This query does not start with SELECT."
+
+    # Every statement is checked so a chained DELETE is reported as such, not just as "multiple statements"
+    for tokens in statements:
+        first = tokens[0].upper
+        if first == "WITH":
+            index = _skip_with_clause(tokens, 0)
+            if index < 0 or index >= len(tokens):
+                return False, "Could not parse the WITH clause. Only WITH ... SELECT queries are allowed."
+            main = tokens[index].upper
+        else:
+            main = first
+
+        if main != "SELECT":
+            if main in DANGEROUS_KEYWORDS:
+                return False, f"Query contains forbidden keyword: {main}. Only read-only SELECT queries are allowed."
+            return False, "Only SELECT queries are allowed. This query does not start with SELECT."
+
+    if len(statements) > 1:
+        return False, "Multiple SQL statements are not allowed. Please submit one query at a time."
+
+    tokens = statements[0]
+    for i, token in enumerate(tokens[:-1]):
+        if token.kind == "word" and tokens[i + 1].text == "(" and token.text.lower() in BLOCKED_FUNCTIONS:
+            return False, f"Function {token.text} is not allowed."
+
+    return True, "Query is safe to execute."
+
+
+def read_only_authorizer(action, arg1, arg2, db_name, trigger_name):
+    if action not in ALLOWED_AUTHORIZER_ACTIONS:
+        return sqlite3.SQLITE_DENY
+    if action == sqlite3.SQLITE_FUNCTION and (arg2 or "").lower() in BLOCKED_FUNCTIONS:
+        return sqlite3.SQLITE_DENY
+    return sqlite3.SQLITE_OK
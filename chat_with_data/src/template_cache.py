@@ -0,0 +1,238 @@
+import os
+import re
+import ast
+import math
+import logging
+import threading
+from collections import Counter, OrderedDict
+from typing import Optional
+
+from src.sql_validator import tokenize
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("ChatWithData.Templates")
+
+TEMPLATE_HINT_SIMILARITY = float(os.environ.get("TEMPLATE_HINT_SIMILARITY", "0.75"))
+MAX_TEMPLATES = 500
+
+NUMBER_PATTERN = re.compile(r'\b\d+(?:\.\d+)?\b')
+DIGEST_VALUES_PATTERN = re.compile(r"\{('.*?')\}")
+WORD_PATTERN = re.compile(r"<\w+>|[a-z0-9']+")
+# Questions that lean on the conversation ("what about 2023?", "split that by month") mean
+# something different in another session, so they are never stored or run directly
+CONTEXT_PATTERN = re.compile(
+    r"^\s*(and|also|what about|how about|what if|same|then|now|instead)\b"
+    r"|\b(it|its|they|them|their|that|this|those|these|same|previous|above|again|instead)\b",
+    re.IGNORECASE
+)
+STOPWORDS = {"the", "a", "an", "of", "for", "in", "on", "by", "me", "show", "what", "are", "is", "please", "list", "give"}
+
+
+def is_context_dependent(question: str) -> bool:
+    return bool(CONTEXT_PATTERN.search(question))
+
+
+def _embed(text: str) -> Counter:
+    # Bag of words plus bigrams; placeholders keep parametric variants close together
+    words = [word for word in WORD_PATTERN.findall(text) if word not in STOPWORDS]
+    return Counter(words + [f"{a} {b}" for a, b in zip(words, words[1:])])
+
+
+def _shape(pattern: str) -> tuple:
+    # Every word, stopwords included; only spacing, case and punctuation are ignored
+    return tuple(WORD_PATTERN.findall(pattern))
+
+
+def _cosine(a: Counter, b: Counter) -> float:
+    if not a or not b:
+        return 0.0
+    dot = sum(count * b.get(term, 0) for term, count in a.items())
+    norm = math.sqrt(sum(c * c for c in a.values())) * math.sqrt(sum(c * c for c in b.values()))
+    return dot / norm if norm else 0.0
+
+
+def _quote_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+class TemplateCache:
+
+    def __init__(
+        self,
+        max_templates: int = MAX_TEMPLATES,
+        hint_similarity: float = TEMPLATE_HINT_SIMILARITY
+    ):
+        self.max_templates = max_templates
+        self.hint_similarity = hint_similarity
+        self._templates = OrderedDict()
+        self._known_values = {}
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.executed = 0
+        self.hinted = 0
+        self.failures = 0
+
+    def learn_values(self, values) -> None:
+        with self._lock:
+            for value in values:
+                if isinstance(value, str) and 1 < len(value) <= 40 and not NUMBER_PATTERN.fullmatch(value):
+                    self._known_values.setdefault(value.lower(), value)
+
+    def learn_schema_digest(self, digest: str) -> None:
+        # The digest lists low-cardinality column values as {'a', 'b'}; those are the likely parameters
+        for match in DIGEST_VALUES_PATTERN.finditer(digest or ""):
+            try:
+                self.learn_values(ast.literal_eval("{" + match.group(1) + "}"))
+            except (ValueError, SyntaxError):
+                continue
+
+    def _extract(self, question: str) -> tuple[str, list[dict]]:
+        lowered = question.lower()
+        params = []
+
+        with self._lock:
+            known_values = sorted(self._known_values.items(), key=lambda item: len(item[0]), reverse=True)
+        taken = []
+        for lowered_value, value in known_values:
+            for match in re.finditer(rf'(?<!\w){re.escape(lowered_value)}(?!\w)', lowered):
+                if not any(start < match.end() and match.start() < end for start, end in taken):
+                    taken.append((match.start(), match.end()))
+                    params.append({"type": "text", "value": value, "span": (match.start(), match.end())})
+
+        for match in NUMBER_PATTERN.finditer(lowered):
+            if not any(start < match.end() and match.start() < end for start, end in taken):
+                params.append({"type": "number", "value": match.group(), "span": match.span()})
+
+        params.sort(key=lambda param: param["span"])
+
+        pattern = []
+        position = 0
+        for param in params:
+            pattern.append(lowered[position:param["span"][0]])
+            pattern.append(f"<{param['type']}>")
+            position = param["span"][1]
+        pattern.append(lowered[position:])
+        return "".join(pattern), params
+
+    def store(self, db_path: str, question: str, sql: str) -> None:
+        if is_context_dependent(question):
+            return
+        tokens = tokenize(sql)
+
+        # String literals in working SQL are the vocabulary for recognising parameters in questions.
+        # Numeric literals ('2024') are left to the number extractor so their variants still match.
+        self.learn_values(token.text[1:-1].replace("''", "'") for token in tokens if token.kind == "string")
+
+        pattern, params = self._extract(question)
+
+        slots = []
+        for param in params:
+            matches = [
+                i for i, token in enumerate(tokens)
+                if (token.kind == "number" and token.text == param["value"])
+                or (token.kind == "string" and token.text[1:-1].replace("''", "'").lower() == param["value"].lower())
+            ]
+            # A parameter is only substitutable when it maps to exactly one literal in the SQL
+            slots.append(matches[0] if len(matches) == 1 else None)
+
+        key = (os.path.abspath(db_path), _shape(pattern))
+        with self._lock:
+            self._templates.pop(key, None)
+            self._templates[key] = {
+                "question": question,
+                "pattern": pattern,
+                "vector": _embed(pattern),
+                "sql": sql,
+                "params": [{"type": p["type"], "value": p["value"], "slot": slot} for p, slot in zip(params, slots)]
+            }
+            while len(self._templates) > self.max_templates:
+                self._templates.popitem(last=False)
+
+    def match(self, db_path: str, question: str) -> Optional[dict]:
+        pattern, params = self._extract(question)
+        vector = _embed(pattern)
+        db_key = os.path.abspath(db_path)
+        exact_key = (db_key, _shape(pattern))
+
+        with self._lock:
+            self.lookups += 1
+            exact = self._templates.get(exact_key)
+            candidates = [(key, t) for key, t in self._templates.items() if key[0] == db_key]
+
+        # Only the same question with other literals may run directly; near misses such as
+        # "lowest" vs "highest" score high on word overlap, so similarity only ever yields a hint
+        if exact is not None:
+            best, best_key, best_score = exact, exact_key, 1.0
+        else:
+            best, best_key, best_score = None, None, 0.0
+            for key, template in candidates:
+                if [p["type"] for p in template["params"]] != [p["type"] for p in params]:
+                    continue
+                score = _cosine(vector, template["vector"])
+                if score > best_score:
+                    best, best_key, best_score = template, key, score
+
+        if best is None or best_score < self.hint_similarity:
+            return None
+
+        tokens = tokenize(best["sql"])
+        replacements = {}
+        # A follow-up only ever gets a hint: the model sees the SQL but decides itself
+        executable = exact is not None and not is_context_dependent(question)
+        for old, new in zip(best["params"], params):
+            if old["slot"] is None:
+                executable = executable and old["value"].lower() == new["value"].lower()
+            elif tokens[old["slot"]].kind == "number":
+                replacements[old["slot"]] = new["value"]
+            else:
+                replacements[old["slot"]] = _quote_literal(new["value"])
+
+        sql = best["sql"]
+        for slot in sorted(replacements, reverse=True):
+            token = tokens[slot]
+            sql = sql[:token.start] + replacements[slot] + sql[token.end:]
+
+        with self._lock:
+            if best_key in self._templates:
+                self._templates.move_to_end(best_key)
+            if executable:
+                self.executed += 1
+            else:
+                self.hinted += 1
+
+        logger.info(f"Template {'hit' if executable else 'hint'} ({best_score:.2f}) for: {question[:60]}")
+        return {
+            "sql": sql,
+            "similarity": best_score,
+            "executable": executable,
+            "template_question": best["question"]
+        }
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self.executed -= 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._templates.clear()
+            self._known_values.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.executed + self.hinted
+            return {
+                "templates": len(self._templates),
+                "lookups": self.lookups,
+                "executed": self.executed,
+                "hinted": self.hinted,
+                "misses": self.lookups - hits - self.failures,
+                "failures": self.failures,
+                "hit_rate": hits / self.lookups if self.lookups else 0.0
+            }
+
+
+template_cache = TemplateCache()
@@ -1,48 +1,105 @@
 import sqlite3
 import re
+import json
+import time
+import asyncio
 import logging
 import requests
+from concurrent.futures import Executor
 from typing import Optional
 import os
 
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from src.connection_pool import get_connection_pool
+from src.query_guard import (
+    QueryGuard, check_query_plan, GUARD_HINTS,
+    QUERY_TIMEOUT_SECONDS, MAX_VM_INSTRUCTIONS, FULL_SCAN_ROW_LIMIT
+)
+from src.result_cache import query_cache, data_version
+from src.schema_cache import schema_cache
+from src.index_advisor import query_log
+from src.analytics_engine import analytics_engine, ANALYTICS_ENGINE
+from src.sql_validator import DANGEROUS_KEYWORDS, validate_query, strip_comments, read_only_authorizer
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger("ChatWithData.Tools")
 
-DANGEROUS_KEYWORDS = [
-    "DROP", "DELETE", "TRUNCATE", "ALTER", "CREATE", "INSERT", "UPDATE",
-    "REPLACE", "RENAME", "GRANT", "REVOKE", "COMMIT", "ROLLBACK",
-    "ATTACH", "DETACH", "VACUUM", "REINDEX", "PRAGMA"
-]
+MAX_RESULT_ROWS = 100
+MAX_RESULT_BYTES = 64 * 1024
+FETCH_BATCH_SIZE = 50
+GITHUB_TIMEOUT_SECONDS = 10
+
+TRAILING_LIMIT_PATTERN = re.compile(
+    r'\bLIMIT\s+\d+(\s*(,|\bOFFSET\b)\s*\d+)?\s*$',
+    re.IGNORECASE
+)
 
 
 def is_safe_query(query: str) -> tuple[bool, str]:
-    normalized = query.upper().strip()
-    normalized = re.sub(r'--.*$', '', normalized, flags=re.MULTILINE)
-    normalized = re.sub(r'/\*.*?\*/', '', normalized, flags=re.DOTALL)
+    is_safe, message = validate_query(query)
+
+    if not is_safe:
+        logger.warning(f"BLOCKED: {message} Query: {query[:50]}...")
+        return False, message
+
+    logger.info(f"APPROVED: Query passed safety check: {query[:50]}...")
+    return True, message
 
-    if not normalized.startswith("SELECT"):
-        logger.warning(f"BLOCKED: Query does not start with SELECT: {query[:50]}...")
-        return False, "Only SELECT queries are allowed. This query does not start with SELECT."
 
-    for keyword in DANGEROUS_KEYWORDS:
-        pattern = rf'\b{keyword}\b'
-        if re.search(pattern, normalized):
-            logger.warning(f"BLOCKED: Query contains dangerous keyword '{keyword}': {query[:50]}...")
-            return False, f"Query contains forbidden keyword: {keyword}. Only read-only SELECT queries are allowed."
+def apply_row_limit(query: str, limit: int) -> tuple[str, bool]:
+    stripped = strip_comments(query).rstrip(';').strip()
 
-    statements = [s.strip() for s in query.split(';') if s.strip()]
-    if len(statements) > 1:
-        logger.warning(f"BLOCKED: Query contains multiple statements: {query[:50]}...")
-        return False, "Multiple SQL statements are not allowed. Please submit one query at a time."
+    if TRAILING_LIMIT_PATTERN.search(stripped):
+        return stripped, False
 
-    logger.info(f"APPROVED: Query passed safety check: {query[:50]}...")
-    return True, "Query is safe to execute."
+    # Newline first so a trailing comment in the original query cannot swallow the LIMIT
+    return f"{stripped}\nLIMIT {limit}", True
+
+
+def fetch_bounded(
+    cursor: sqlite3.Cursor,
+    max_rows: int = MAX_RESULT_ROWS,
+    max_bytes: int = MAX_RESULT_BYTES,
+    batch_size: int = FETCH_BATCH_SIZE
+) -> tuple[list, bool, Optional[str]]:
+    data = []
+    used_bytes = 0
+
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            return data, False, None
 
+        for row in batch:
+            if len(data) >= max_rows:
+                return data, True, "row_limit"
 
-def query_database(query: str, db_path: str = "data/ecommerce.db") -> dict:
+            row_bytes = len(json.dumps(row, default=str))
+            if data and used_bytes + row_bytes > max_bytes:
+                return data, True, "byte_limit"
+
+            data.append(row)
+            used_bytes += row_bytes
+
+
+def query_database(
+    query: str,
+    db_path: str = "data/ecommerce.db",
+    max_rows: int = MAX_RESULT_ROWS,
+    max_bytes: int = MAX_RESULT_BYTES,
+    timeout: float = QUERY_TIMEOUT_SECONDS,
+    max_instructions: int = MAX_VM_INSTRUCTIONS,
+    max_scan_rows: int = FULL_SCAN_ROW_LIMIT,
+    use_cache: bool = True,
+    engine: str = ANALYTICS_ENGINE
+) -> dict:
     logger.info(f"Executing query: {query}")
 
     is_safe, message = is_safe_query(query)
@@ -55,35 +112,92 @@ def query_database(query: str, db_path: str = "data/ecommerce.db") -> dict:
             "columns": None
         }
 
-    try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-
-        cursor.execute(query)
-        columns = [description[0] for description in cursor.description]
-        data = cursor.fetchall()
+    if use_cache:
+        cache_key = query_cache.make_key(db_path, query, max_rows, max_bytes)
+        version = data_version(db_path)
+        cached = query_cache.get(cache_key, version)
+        if cached is not None:
+            logger.info(f"Cache hit. Returned {cached['row_count']} rows.")
+            return {**cached, "cached": True}
 
-        conn.close()
+    # One row past the cap tells us whether more rows exist without scanning the rest
+    limited_query, limit_applied = apply_row_limit(query, max_rows + 1)
 
-        logger.info(f"Query successful. Returned {len(data)} rows.")
+    # Decided before borrowing a connection: the schema lookup behind it may need one of its own
+    route = analytics_engine.should_route(query, db_path, engine)
 
-        max_rows = 100
-        if len(data) > max_rows:
-            logger.info(f"Truncating results from {len(data)} to {max_rows} rows")
-            data = data[:max_rows]
-            truncated = True
-        else:
-            truncated = False
+    guard = None
+    try:
+        with get_connection_pool(db_path).connection() as conn:
+            # DuckDB only gets queries SQLite itself would compile as plain reads. The full-scan guard
+            # protects SQLite, so it is skipped for them: large scans are what the columnar engine is for.
+            if route and _compiles_read_only(conn, limited_query):
+                result = _query_analytics_engine(query, limited_query, db_path, max_rows, max_bytes, timeout)
+                if result is not None:
+                    result["limit_applied"] = limit_applied
+                    if use_cache and result["success"]:
+                        query_cache.put(cache_key, version, result)
+                    return {**result, "cached": False}
+
+            plan_error = check_query_plan(conn, limited_query, db_path, max_scan_rows)
+            if plan_error:
+                return {
+                    "success": False,
+                    "error": plan_error,
+                    "guard": "full_scan",
+                    "hint": GUARD_HINTS["full_scan"],
+                    "data": None,
+                    "columns": None
+                }
 
-        return {
+            start_time = time.perf_counter()
+            with QueryGuard(conn, timeout=timeout, max_instructions=max_instructions) as guard:
+                # Second line of defence: SQLite refuses to compile anything but reads
+                conn.set_authorizer(read_only_authorizer)
+                try:
+                    cursor = conn.cursor()
+
+                    cursor.execute(limited_query)
+                    columns = [description[0] for description in cursor.description]
+                    data, truncated, truncation_reason = fetch_bounded(cursor, max_rows, max_bytes)
+                    cursor.close()
+                finally:
+                    conn.set_authorizer(None)
+            elapsed_ms = (time.perf_counter() - start_time) * 1000
+
+        query_log.record(query, elapsed_ms, len(data))
+        logger.info(f"Query successful. Returned {len(data)} rows in {elapsed_ms:.1f} ms.")
+        if truncated:
+            logger.info(f"Results truncated at {len(data)} rows ({truncation_reason}); more rows available")
+
+        result = {
             "success": True,
             "data": data,
             "columns": columns,
             "row_count": len(data),
-            "truncated": truncated
+            "truncated": truncated,
+            "more_rows_available": truncated,
+            "truncation_reason": truncation_reason,
+            "limit_applied": limit_applied,
+            "engine": "sqlite"
         }
 
+        if use_cache:
+            query_cache.put(cache_key, version, result)
+
+        return {**result, "cached": False}
+
     except sqlite3.Error as e:
+        if guard is not None and guard.fired:
+            logger.error(f"Query stopped by {guard.fired} guard after ~{guard.instructions:,} instructions")
+            return {
+                "success": False,
+                "error": guard.error_message(),
+                "guard": guard.fired,
+                "hint": GUARD_HINTS[guard.fired],
+                "data": None,
+                "columns": None
+            }
         logger.error(f"Database error: {str(e)}")
         return {
             "success": False,
@@ -101,43 +215,78 @@ def query_database(query: str, db_path: str = "data/ecommerce.db") -> dict:
         }
 
 
-def get_database_schema(db_path: str = "data/ecommerce.db") -> dict:
-    logger.info("Fetching database schema")
-
+def _compiles_read_only(conn: sqlite3.Connection, query: str) -> bool:
+    conn.set_authorizer(read_only_authorizer)
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
-        tables = [row[0] for row in cursor.fetchall()]
-
-        schema = {}
-        for table in tables:
-            cursor.execute(f"PRAGMA table_info({table})")
-            columns = cursor.fetchall()
-            schema[table] = [
-                {
-                    "name": col[1],
-                    "type": col[2],
-                    "nullable": not col[3],
-                    "primary_key": bool(col[5])
-                }
-                for col in columns
-            ]
-
-            cursor.execute(f"SELECT COUNT(*) FROM {table}")
-            row_count = cursor.fetchone()[0]
-            schema[table] = {
-                "columns": schema[table],
-                "row_count": row_count
+        conn.execute(f"EXPLAIN {query}").close()
+        return True
+    except sqlite3.Error as e:
+        logger.info(f"Query not routed to the analytics engine: {str(e)}")
+        return False
+    finally:
+        conn.set_authorizer(None)
+
+
+def _query_analytics_engine(
+    query: str,
+    limited_query: str,
+    db_path: str,
+    max_rows: int,
+    max_bytes: int,
+    timeout: float
+) -> Optional[dict]:
+    # Returns None when the query should run on SQLite instead
+    analytics_query = None
+    try:
+        start_time = time.perf_counter()
+        with analytics_engine.query(db_path, timeout=timeout) as analytics_query:
+            cursor = analytics_query.execute(limited_query)
+            columns = [description[0] for description in cursor.description]
+            data, truncated, truncation_reason = fetch_bounded(cursor, max_rows, max_bytes)
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+    except Exception as e:
+        if analytics_query is not None and analytics_query.timed_out:
+            logger.error(f"Analytics query stopped after {timeout:g}s")
+            return {
+                "success": False,
+                "error": f"Query exceeded the {timeout:g}s time limit and was stopped.",
+                "guard": "timeout",
+                "hint": GUARD_HINTS["timeout"],
+                "data": None,
+                "columns": None
             }
+        logger.info(f"Analytics engine cannot run query, falling back to SQLite: {str(e)}")
+        return None
+
+    query_log.record(query, elapsed_ms, len(data))
+    logger.info(f"Analytics query successful. Returned {len(data)} rows in {elapsed_ms:.1f} ms.")
+
+    return {
+        "success": True,
+        "data": data,
+        "columns": columns,
+        "row_count": len(data),
+        "truncated": truncated,
+        "more_rows_available": truncated,
+        "truncation_reason": truncation_reason,
+        "engine": "duckdb"
+    }
 
-        conn.close()
 
-        logger.info(f"Schema retrieved successfully. Found {len(tables)} tables.")
+def get_database_schema(db_path: str = "data/ecommerce.db", exact_counts: bool = False) -> dict:
+    logger.info("Fetching database schema")
+
+    try:
+        result = schema_cache.get_schema(db_path, exact_counts=exact_counts)
+
+        logger.info(
+            f"Schema retrieved successfully. Found {len(result['schema'])} tables"
+            f"{' (cached)' if result['cached'] else ''}."
+        )
         return {
             "success": True,
-            "schema": schema
+            "schema": result["schema"],
+            "schema_version": result["schema_version"]
         }
 
     except Exception as e:
@@ -149,6 +298,59 @@ def get_database_schema(db_path: str = "data/ecommerce.db") -> dict:
         }
 
 
+def _simulated_issue(title: str, body: str, repo_owner: str, repo_name: str) -> dict:
+    logger.warning("No GitHub token provided - returning simulated response")
+    return {
+        "success": True,
+        "simulated": True,
+        "message": "Support ticket would be created (GitHub token not configured)",
+        "issue": {
+            "title": title,
+            "body": body,
+            "repo": f"{repo_owner}/{repo_name}",
+            "url": f"https://github.com/{repo_owner}/{repo_name}/issues/new"
+        }
+    }
+
+
+def _github_issue_request(title: str, body: str, repo_owner: str, repo_name: str, token: str) -> dict:
+    return {
+        "url": f"https://api.github.com/repos/{repo_owner}/{repo_name}/issues",
+        "headers": {
+            "Authorization": f"token {token}",
+            "Accept": "application/vnd.github.v3+json"
+        },
+        "json": {
+            "title": f"[Support] {title}",
+            "body": body,
+            "labels": ["support", "user-request"]
+        }
+    }
+
+
+def _github_issue_result(status_code: int, response_json, response_text: str) -> dict:
+    if status_code == 201:
+        issue_data = response_json()
+        logger.info(f"GitHub issue created successfully: {issue_data['html_url']}")
+        return {
+            "success": True,
+            "simulated": False,
+            "issue": {
+                "number": issue_data["number"],
+                "title": issue_data["title"],
+                "url": issue_data["html_url"],
+                "state": issue_data["state"]
+            }
+        }
+
+    logger.error(f"GitHub API error: {status_code} - {response_text}")
+    return {
+        "success": False,
+        "error": f"GitHub API error: {status_code}",
+        "details": response_text
+    }
+
+
 def create_github_issue(
     title: str,
     body: str,
@@ -161,56 +363,48 @@ def create_github_issue(
     token = github_token or os.environ.get("GITHUB_TOKEN")
 
     if not token:
-        logger.warning("No GitHub token provided - returning simulated response")
+        return _simulated_issue(title, body, repo_owner, repo_name)
+
+    try:
+        response = requests.post(
+            **_github_issue_request(title, body, repo_owner, repo_name, token), timeout=GITHUB_TIMEOUT_SECONDS
+        )
+        return _github_issue_result(response.status_code, response.json, response.text)
+
+    except requests.RequestException as e:
+        logger.error(f"Request error: {str(e)}")
         return {
-            "success": True,
-            "simulated": True,
-            "message": "Support ticket would be created (GitHub token not configured)",
-            "issue": {
-                "title": title,
-                "body": body,
-                "repo": f"{repo_owner}/{repo_name}",
-                "url": f"https://github.com/{repo_owner}/{repo_name}/issues/new"
-            }
+            "success": False,
+            "error": f"Request error: {str(e)}"
         }
 
-    url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/issues"
-    headers = {
-        "Authorization": f"token {token}",
-        "Accept": "application/vnd.github.v3+json"
-    }
 
-    payload = {
-        "title": f"[Support] {title}",
-        "body": body,
-        "labels": ["support", "user-request"]
-    }
+async def create_github_issue_async(
+    title: str,
+    body: str,
+    repo_owner: str,
+    repo_name: str,
+    github_token: Optional[str] = None
+) -> dict:
+    token = github_token or os.environ.get("GITHUB_TOKEN")
 
-    try:
-        response = requests.post(url, json=payload, headers=headers)
+    if httpx is None and token:
+        # Without httpx the blocking client runs on a worker thread instead
+        return await asyncio.get_running_loop().run_in_executor(
+            None, create_github_issue, title, body, repo_owner, repo_name, github_token
+        )
 
-        if response.status_code == 201:
-            issue_data = response.json()
-            logger.info(f"GitHub issue created successfully: {issue_data['html_url']}")
-            return {
-                "success": True,
-                "simulated": False,
-                "issue": {
-                    "number": issue_data["number"],
-                    "title": issue_data["title"],
-                    "url": issue_data["html_url"],
-                    "state": issue_data["state"]
-                }
-            }
-        else:
-            logger.error(f"GitHub API error: {response.status_code} - {response.text}")
-            return {
-                "success": False,
-                "error": f"GitHub API error: {response.status_code}",
-                "details": response.text
-            }
+    logger.info(f"Creating GitHub issue: {title}")
 
-    except requests.RequestException as e:
+    if not token:
+        return _simulated_issue(title, body, repo_owner, repo_name)
+
+    try:
+        async with httpx.AsyncClient(timeout=GITHUB_TIMEOUT_SECONDS) as client:
+            response = await client.post(**_github_issue_request(title, body, repo_owner, repo_name, token))
+        return _github_issue_result(response.status_code, response.json, response.text)
+
+    except httpx.HTTPError as e:
         logger.error(f"Request error: {str(e)}")
         return {
             "success": False,
@@ -218,6 +412,10 @@ def create_github_issue(
         }
 
 
+def get_query_cache_stats() -> dict:
+    return query_cache.stats()
+
+
 def get_sample_queries() -> list[dict]:
     return [
         {
@@ -265,10 +463,15 @@ TOOL_DEFINITIONS = [
         "type": "function",
         "function": {
             "name": "get_database_schema",
-            "description": "Get the database schema including all tables, their columns, data types, and row counts. Use this to understand the database structure before writing queries.",
+            "description": "Get the database schema including all tables, their columns, data types, indexes, foreign keys, and approximate row counts. Use this to understand the database structure before writing queries.",
             "parameters": {
                 "type": "object",
-                "properties": {},
+                "properties": {
+                    "exact_counts": {
+                        "type": "boolean",
+                        "description": "Return exact row counts instead of fast estimates. Slow on large tables; only use when the user needs precise counts."
+                    }
+                },
                 "required": []
             }
         }
@@ -304,10 +507,17 @@ def execute_tool(tool_name: str, arguments: dict, config: dict = None) -> dict:
     logger.info(f"Executing tool: {tool_name} with args: {arguments}")
 
     if tool_name == "query_database":
-        return query_database(arguments.get("query", ""), db_path=db_path)
+        return query_database(
+            arguments.get("query", ""),
+            db_path=db_path,
+            timeout=config.get("query_timeout", QUERY_TIMEOUT_SECONDS),
+            max_instructions=config.get("max_vm_instructions", MAX_VM_INSTRUCTIONS),
+            max_scan_rows=config.get("full_scan_row_limit", FULL_SCAN_ROW_LIMIT),
+            engine=config.get("analytics_engine", ANALYTICS_ENGINE)
+        )
 
     elif tool_name == "get_database_schema":
-        return get_database_schema(db_path=db_path)
+        return get_database_schema(db_path=db_path, exact_counts=bool(arguments.get("exact_counts", False)))
 
     elif tool_name == "create_support_ticket":
         return create_github_issue(
@@ -324,3 +534,25 @@ def execute_tool(tool_name: str, arguments: dict, config: dict = None) -> dict:
             "success": False,
             "error": f"Unknown tool: {tool_name}"
         }
+
+
+async def execute_tool_async(
+    tool_name: str,
+    arguments: dict,
+    config: dict = None,
+    executor: Optional[Executor] = None
+) -> dict:
+    config = config or {}
+
+    if tool_name == "create_support_ticket":
+        logger.info(f"Executing tool: {tool_name} with args: {arguments}")
+        return await create_github_issue_async(
+            title=arguments.get("title", "Support Request"),
+            body=arguments.get("description", "No description provided"),
+            repo_owner=config.get("github_owner", "owner"),
+            repo_name=config.get("github_repo", "repo"),
+            github_token=config.get("github_token")
+        )
+
+    # sqlite3 has no async interface; queries run on worker threads with their own pooled connections
+    return await asyncio.get_running_loop().run_in_executor(executor, execute_tool, tool_name, arguments, config)
@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("ChatWithData.Tracing")
+
+TRACE_PATH = os.environ.get("TRACE_PATH", "logs/traces.jsonl")
+# The file is moved to TRACE_PATH + ".1" (replacing the previous one) once it passes this size
+TRACE_MAX_BYTES = int(os.environ.get("TRACE_MAX_BYTES", str(10 * 1024 * 1024)))
+MAX_RECENT_TRACES = 200
+TAIL_CHUNK_BYTES = 64 * 1024
+
+# Span names grouped into the categories shown in the Performance tab
+SPAN_CATEGORIES = {
+    "llm_call": "llm",
+    "tool": "tools",
+    "serialize": "serialize",
+    "history_compact": "prompt",
+    "system_prompt": "prompt",
+    "template_lookup": "prompt"
+}
+
+
+class TurnTrace:
+
+    def __init__(self, tracer: "Tracer", session_id: str, question: str):
+        self.tracer = tracer
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.session_id = session_id
+        self.question = question
+        self.started_at = time.time()
+        self.attributes = {}
+        self.spans = []
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        # Tools run on worker threads, so spans are appended under a lock
+        span = dict(attributes)
+        start = time.perf_counter()
+        try:
+            yield span
+        except Exception as e:
+            span["error"] = str(e)
+            raise
+        finally:
+            span = {
+                "name": name,
+                "start_ms": round((start - self._start) * 1000, 3),
+                "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+                **span
+            }
+            with self._lock:
+                self.spans.append(span)
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def finish(self) -> dict:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span["start_ms"])
+        record = {
+            "trace_id": self.trace_id,
+            "session_id": self.session_id,
+            "ts": self.started_at,
+            "question": self.question,
+            "duration_ms": round((time.perf_counter() - self._start) * 1000, 3),
+            **self.attributes,
+            "spans": spans
+        }
+        self.tracer.write(record)
+        return record
+
+
+class Tracer:
+
+    def __init__(self, path: str = TRACE_PATH, max_recent: int = MAX_RECENT_TRACES, max_bytes: int = TRACE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        # Turns from earlier runs stay visible after a restart
+        self.recent = deque(self.load(path, max_recent), maxlen=max_recent)
+        self._lock = threading.Lock()
+
+    def start_turn(self, session_id: str, question: str) -> TurnTrace:
+        return TurnTrace(self, session_id, question)
+
+    def write(self, record: dict) -> None:
+        with self._lock:
+            self.recent.append(record)
+            if self.path:
+                try:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(record, default=str) + "\n")
+                        size = f.tell()
+                    if self.max_bytes and size > self.max_bytes:
+                        os.replace(self.path, self.path + ".1")
+                except OSError as e:
+                    logger.warning(f"Could not write trace: {str(e)}")
+
+    @staticmethod
+    def load(path: str = TRACE_PATH, limit: int = MAX_RECENT_TRACES) -> list[dict]:
+        if not path or not os.path.exists(path):
+            return []
+
+        # Read backwards from the end, so the cost depends on the limit rather than the file size
+        with open(path, "rb") as f:
+            position = f.seek(0, os.SEEK_END)
+            buffer = b""
+            while position > 0 and buffer.count(b"\n") <= limit:
+                size = min(TAIL_CHUNK_BYTES, position)
+                position -= size
+                f.seek(position)
+                buffer = f.read(size) + buffer
+
+        records = []
+        # A partial first line fails to parse and is skipped
+        for line in buffer.splitlines()[-limit:]:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        return records
+
+
+def summarize_turn(record: dict) -> dict:
+    spans = record.get("spans", [])
+    totals = {category: 0.0 for category in set(SPAN_CATEGORIES.values())}
+    for span in spans:
+        category = SPAN_CATEGORIES.get(span["name"])
+        if category:
+            totals[category] += span["duration_ms"]
+
+    llm_calls = [span for span in spans if span["name"] == "llm_call"]
+    queries = [span for span in spans if span["name"] == "tool" and span.get("tool") == "query_database"]
+    usage = record.get("usage") or {}
+
+    return {
+        "trace_id": record["trace_id"],
+        "session_id": record.get("session_id"),
+        "time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record["ts"])),
+        "question": record.get("question", ""),
+        "duration_ms": record["duration_ms"],
+        **{f"{category}_ms": round(total, 1) for category, total in sorted(totals.items())},
+        "llm_calls": len(llm_calls),
+        "ttft_ms": llm_calls[0].get("ttft_ms") if llm_calls else None,
+        "queries": len(queries),
+        "rows": sum(span.get("rows") or 0 for span in queries),
+        "cache_hits": sum(1 for span in queries if span.get("cached")),
+        "template": record.get("template"),
+        "prompt_tokens": usage.get("prompt_tokens", 0),
+        "completion_tokens": usage.get("completion_tokens", 0),
+        "budget_exceeded": record.get("budget_exceeded")
+    }
+
+
+tracer = Tracer()
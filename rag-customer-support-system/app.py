@@ -6,6 +6,7 @@ from datetime import datetime
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from src.rag_engine import RAGEngine
+from src.asset_store import AssetStore
 import config
 st.set_page_config(
     page_title="Tesla Cybertruck Support",
@@ -67,6 +68,10 @@ st.markdown("""
 if 'messages' not in st.session_state:
     st.session_state.messages = []
 
+@st.cache_resource
+def get_asset_store():
+    return AssetStore(config.ASSET_DIR)
+
 if 'rag_engine' not in st.session_state:
     with st.spinner("Initializing support system..."):
         st.session_state.rag_engine = RAGEngine()
@@ -110,7 +115,7 @@ with st.sidebar:
 st.markdown('<div class="main-header">🚙 Tesla Cybertruck Support Assistant</div>', unsafe_allow_html=True)
 st.markdown('<div class="sub-header">Ask questions about your Cybertruck or create support tickets</div>', unsafe_allow_html=True)
 
-for message in st.session_state.messages:
+for message_index, message in enumerate(st.session_state.messages):
     role = message["role"]
     content = message["content"]
 
@@ -125,6 +130,17 @@ for message in st.session_state.messages:
                     metadata = source['metadata']
                     st.markdown(f"**Source {i}:** {metadata['filename']}, Page {metadata['page_number']}")
                     st.text(source['text'][:200] + "...")
+
+                    image_refs = [ref for ref in metadata.get('image_refs', '').split(',') if ref]
+                    # Images are read from the asset store only when the user asks for them
+                    if image_refs and st.checkbox(
+                        f"Show {len(image_refs)} page image(s)",
+                        key=f"images_{message_index}_{i}"
+                    ):
+                        asset_store = get_asset_store()
+                        for ref in image_refs:
+                            if asset_store.exists(ref):
+                                st.image(asset_store.resolve(ref))
                     st.markdown("---")
 
 user_input = st.chat_input("Ask a question or request support...")
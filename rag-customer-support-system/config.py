@@ -4,12 +4,14 @@ from dotenv import load_dotenv
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4-turbo-preview")
 TEMPERATURE = float(os.getenv("TEMPERATURE", "0.7"))
 MAX_TOKENS = int(os.getenv("MAX_TOKENS", "1000"))
 
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 GITHUB_REPO = os.getenv("GITHUB_REPO")
+GITHUB_API_BASE = os.getenv("GITHUB_API_BASE", "https://api.github.com")
 
 COMPANY_NAME = os.getenv("COMPANY_NAME", "Tesla Cybertruck Support")
 COMPANY_EMAIL = os.getenv("COMPANY_EMAIL", "support@cybertruck-support.com")
@@ -19,8 +21,31 @@ CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "500"))
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "50"))
 TOP_K_RESULTS = int(os.getenv("TOP_K_RESULTS", "3"))
 
+# "rolling" summarizes older turns and keeps recent ones verbatim; "full" sends the last 10 messages as-is
+HISTORY_MODE = os.getenv("HISTORY_MODE", "rolling")
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))
+HISTORY_RECENT_MESSAGES = int(os.getenv("HISTORY_RECENT_MESSAGES", "4"))
+HISTORY_SUMMARY_TOKENS = int(os.getenv("HISTORY_SUMMARY_TOKENS", "300"))
+# Follow-ups are always searched; this fuses the previous turn's sources into their results
+REUSE_FOLLOW_UP_SOURCES = os.getenv("REUSE_FOLLOW_UP_SOURCES", "true").lower() == "true"
+
+# "off", "follow_up" (rewrite only detected follow-up questions) or "always"
+QUERY_REWRITE_MODE = os.getenv("QUERY_REWRITE_MODE", "off")
+QUERY_REWRITE_MODEL = os.getenv("QUERY_REWRITE_MODEL", "gpt-4o-mini")
+QUERY_REWRITE_TIMEOUT = float(os.getenv("QUERY_REWRITE_TIMEOUT", "1.5"))
+QUERY_REWRITE_PARAPHRASES = int(os.getenv("QUERY_REWRITE_PARAPHRASES", "2"))
+# Threads shared by all engines in the process for in-flight rewrite calls
+QUERY_REWRITE_WORKERS = int(os.getenv("QUERY_REWRITE_WORKERS", "16"))
+
+EXTRACT_TABLES = os.getenv("EXTRACT_TABLES", "true").lower() == "true"
+EXTRACT_IMAGES = os.getenv("EXTRACT_IMAGES", "true").lower() == "true"
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "1"))
+
 DATASOURCE_DIR = "datasource"
 VECTOR_DB_PATH = "chroma_db"
+ASSET_DIR = os.getenv("ASSET_DIR", "assets")
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "snapshots/cybertruck_docs.snap")
+SNAPSHOT_DTYPE = os.getenv("SNAPSHOT_DTYPE", "float16")
 
 SYSTEM_PROMPT = f"""You are a helpful customer support assistant for {COMPANY_NAME}.
 
@@ -40,6 +65,12 @@ When answering questions:
 - Be friendly and professional
 """
 
+QUERY_REWRITE_PROMPT = """You rewrite customer questions into search queries for Tesla Cybertruck documentation.
+
+Given the recent conversation and the latest question, resolve pronouns and references so the query stands alone.
+Respond with JSON only: {"query": "<standalone query>", "paraphrases": ["<alternative wording>", ...]}
+Keep each query under 20 words."""
+
 FUNCTIONS = [
     {
         "type": "function",
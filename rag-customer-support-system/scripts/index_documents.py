@@ -14,7 +14,11 @@ def main():
 
     processor = DocumentProcessor(
         chunk_size=config.CHUNK_SIZE,
-        chunk_overlap=config.CHUNK_OVERLAP
+        chunk_overlap=config.CHUNK_OVERLAP,
+        asset_dir=config.ASSET_DIR,
+        extract_tables=config.EXTRACT_TABLES,
+        extract_images=config.EXTRACT_IMAGES,
+        workers=config.EXTRACTION_WORKERS
     )
     vector_store = VectorStore(persist_directory=config.VECTOR_DB_PATH)
 
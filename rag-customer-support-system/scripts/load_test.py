@@ -0,0 +1,311 @@
+import sys
+import os
+import json
+import time
+import random
+import argparse
+import threading
+import statistics
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_QUESTIONS = [
+    ("How do I charge the Cybertruck?", 5),
+    ("What is the towing capacity?", 5),
+    ("How do I enable autopilot?", 4),
+    ("What about in winter?", 3),
+    ("How do I open the tonneau cover?", 3),
+    ("Can you tell me more about that?", 2),
+    ("Please create a support ticket about my charging port. My name is Alex Doe, email alex@example.com", 1),
+]
+
+FAKE_CHUNKS = [
+    "The Cybertruck supports AC charging up to 11.5 kW and DC fast charging at Superchargers.",
+    "Maximum towing capacity is 11,000 lbs when properly equipped.",
+    "Autopilot features can be enabled from Controls > Autopilot on the touchscreen.",
+    "In cold weather, precondition the battery before driving or charging for best range.",
+    "The powered tonneau cover can be opened from the touchscreen or the mobile app.",
+]
+
+
+class MockState:
+    def __init__(self, latency_ms: float, jitter_ms: float, tool_call_rate: float):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tool_call_rate = tool_call_rate
+        self.lock = threading.Lock()
+        self.chat_requests = 0
+        self.issues_created = 0
+
+    def sleep(self):
+        delay = max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+        time.sleep(delay)
+
+
+def make_handler(state: MockState):
+    class MockHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, payload: dict):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_json(self) -> dict:
+            length = int(self.headers.get("Content-Length", 0))
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_GET(self):
+            if self.path.startswith("/repos/"):
+                self._send_json(200, {"full_name": self.path[len("/repos/"):]})
+            else:
+                self._send_json(404, {"message": "Not Found"})
+
+        def do_POST(self):
+            request = self._read_json()
+
+            if self.path.endswith("/chat/completions"):
+                self._send_json(200, self._chat_completion(request))
+            elif self.path.startswith("/repos/") and self.path.endswith("/issues"):
+                with state.lock:
+                    state.issues_created += 1
+                    number = state.issues_created
+                repo = self.path[len("/repos/"):-len("/issues")]
+                self._send_json(201, {
+                    "number": number,
+                    "title": request.get("title", ""),
+                    "state": "open",
+                    "html_url": f"https://github.com/{repo}/issues/{number}"
+                })
+            else:
+                self._send_json(404, {"message": "Not Found"})
+
+        def _chat_completion(self, request: dict) -> dict:
+            with state.lock:
+                state.chat_requests += 1
+
+            state.sleep()
+
+            messages = request.get("messages", [])
+            last_user = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+            # RAGEngine wraps the question in a prompt that always mentions support tickets,
+            # so only the question line decides whether the mock asks for one
+            question = last_user.split("User Question:", 1)[-1].strip().split("\n", 1)[0]
+            prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+
+            message = {"role": "assistant", "content": None}
+            finish_reason = "stop"
+
+            if request.get("response_format", {}).get("type") == "json_object":
+                message["content"] = json.dumps({"query": last_user[-120:], "paraphrases": [last_user[-80:]]})
+            elif request.get("tools") and ("ticket" in question.lower() or random.random() < state.tool_call_rate):
+                finish_reason = "tool_calls"
+                message["tool_calls"] = [{
+                    "id": f"call_{random.randint(0, 10**9)}",
+                    "type": "function",
+                    "function": {
+                        "name": "create_support_ticket",
+                        "arguments": json.dumps({
+                            "user_name": "Load Test",
+                            "user_email": "load@example.com",
+                            "title": "Load test ticket",
+                            "description": question[:200]
+                        })
+                    }
+                }]
+            else:
+                message["content"] = (
+                    "Based on the documentation, here is what you need to know. "
+                    "[Source: Tesla-Cybertruck-Electrek-2021.pdf, Page: 1] " * 3
+                )
+
+            completion_tokens = len(message["content"] or "") // 4 + 20
+            return {
+                "id": f"chatcmpl-{random.randint(0, 10**9)}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "mock"),
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens
+                }
+            }
+
+    return MockHandler
+
+
+class FakeVectorStore:
+    def __init__(self, latency_ms: float = 5.0):
+        self.latency_ms = latency_ms
+        self.collection_name = "load_test"
+
+    def search(self, query: str, top_k: int = 3):
+        time.sleep(self.latency_ms / 1000)
+        return [
+            {
+                'id': f"chunk_{i}",
+                'text': FAKE_CHUNKS[i % len(FAKE_CHUNKS)],
+                'metadata': {'filename': 'Tesla-Cybertruck-Electrek-2021.pdf', 'page_number': i + 1, 'chunk_id': i},
+                'distance': 0.1 * (i + 1)
+            }
+            for i in random.sample(range(len(FAKE_CHUNKS)), top_k)
+        ]
+
+    def search_batch(self, queries, top_k: int = 3):
+        return [self.search(query, top_k) for query in queries]
+
+    def get_collection_stats(self):
+        return {'collection_name': self.collection_name, 'total_chunks': len(FAKE_CHUNKS), 'persist_directory': None}
+
+
+def read_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def load_question_mix(path):
+    if not path:
+        return DEFAULT_QUESTIONS
+    with open(path) as f:
+        data = json.load(f)
+    return [(item["question"], item.get("weight", 1)) for item in data]
+
+
+def run_user(engine_factory, questions, weights, turns: int, results: list, lock: threading.Lock):
+    engine = engine_factory()
+    history = []
+
+    for _ in range(turns):
+        question = random.choices(questions, weights=weights)[0]
+        start = time.perf_counter()
+        response = engine.query(user_message=question, conversation_history=history)
+        elapsed = time.perf_counter() - start
+
+        history.append({"role": "user", "content": question})
+        history.append({"role": "assistant", "content": response['content']})
+
+        with lock:
+            results.append((elapsed, response['type']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test RAGEngine against local mock OpenAI and GitHub APIs")
+    parser.add_argument("--users", type=int, default=100, help="Concurrent simulated users")
+    parser.add_argument("--turns", type=int, default=5, help="Questions asked by each user")
+    parser.add_argument("--latency-ms", type=float, default=800, help="Mean mock LLM latency")
+    parser.add_argument("--jitter-ms", type=float, default=200, help="Std deviation of mock LLM latency")
+    parser.add_argument("--tool-call-rate", type=float, default=0.05, help="Share of answers returned as ticket tool calls")
+    parser.add_argument("--retrieval", choices=["fake", "real"], default="fake",
+                        help="'real' uses the local ChromaDB index and embedding model (must already be cached)")
+    parser.add_argument("--retrieval-latency-ms", type=float, default=5, help="Latency of the fake retriever")
+    parser.add_argument("--questions", help="JSON file with [{\"question\": ..., \"weight\": ...}]")
+    args = parser.parse_args()
+
+    state = MockState(args.latency_ms, args.jitter_ms, args.tool_call_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    import config
+    config.OPENAI_API_KEY = "sk-mock"
+    config.OPENAI_BASE_URL = f"{base_url}/v1"
+    config.GITHUB_TOKEN = "ghp_mock"
+    config.GITHUB_REPO = "load-test/support"
+    config.GITHUB_API_BASE = base_url
+
+    from src.rag_engine import RAGEngine
+
+    if args.retrieval == "real":
+        from src.vector_store import VectorStore
+        vector_store = VectorStore(persist_directory=config.VECTOR_DB_PATH)
+    else:
+        vector_store = FakeVectorStore(args.retrieval_latency_ms)
+
+    question_mix = load_question_mix(args.questions)
+    questions = [q for q, _ in question_mix]
+    weights = [w for _, w in question_mix]
+
+    print("=" * 60)
+    print("RAG Support Assistant Load Test")
+    print("=" * 60)
+    print(f"Mock server: {base_url}")
+    print(f"Users: {args.users}, turns per user: {args.turns}, retrieval: {args.retrieval}")
+    print(f"Mock LLM latency: {args.latency_ms:.0f}ms ± {args.jitter_ms:.0f}ms")
+
+    rss_start = read_rss_mb()
+    rss_peak = [rss_start]
+    stop_sampling = threading.Event()
+
+    def sample_memory():
+        while not stop_sampling.wait(0.25):
+            rss_peak[0] = max(rss_peak[0], read_rss_mb())
+
+    threading.Thread(target=sample_memory, daemon=True).start()
+
+    results = []
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=args.users) as executor:
+        futures = [
+            executor.submit(run_user, lambda: RAGEngine(vector_store=vector_store), questions, weights, args.turns, results, lock)
+            for _ in range(args.users)
+        ]
+        failures = [f.exception() for f in futures if f.exception()]
+
+    wall_time = time.perf_counter() - start
+    stop_sampling.set()
+    rss_end = read_rss_mb()
+    server.shutdown()
+
+    latencies = [elapsed * 1000 for elapsed, _ in results]
+    types = Counter(response_type for _, response_type in results)
+
+    print("\n" + "=" * 60)
+    print("Results")
+    print("=" * 60)
+    print(f"Requests completed: {len(results)} in {wall_time:.2f}s")
+    print(f"Throughput: {len(results) / wall_time:.2f} req/s")
+    if latencies:
+        print(f"Latency mean: {statistics.mean(latencies):.0f}ms")
+        for pct in (50, 90, 95, 99):
+            print(f"Latency p{pct}: {percentile(latencies, pct):.0f}ms")
+        print(f"Latency max: {max(latencies):.0f}ms")
+    print(f"Response types: {dict(types)}")
+    print(f"Mock LLM requests: {state.chat_requests}, tickets created: {state.issues_created}")
+    print(f"Memory RSS: start {rss_start:.1f} MB, peak {rss_peak[0]:.1f} MB, end {rss_end:.1f} MB "
+          f"(growth {rss_end - rss_start:+.1f} MB)")
+    if failures:
+        print(f"✗ {len(failures)} user sessions failed, first error: {failures[0]}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import sys
+import os
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.vector_store import VectorStore
+import config
+
+def export_index(path: str, dtype: str):
+    vector_store = VectorStore(persist_directory=config.VECTOR_DB_PATH)
+    manifest = vector_store.export_snapshot(
+        path,
+        dtype=dtype,
+        chunking={
+            'chunk_size': config.CHUNK_SIZE,
+            'chunk_overlap': config.CHUNK_OVERLAP
+        }
+    )
+
+    print(f"Collection: {manifest['collection_name']}")
+    print(f"Embedding model: {manifest['embedding_model']}")
+    print(f"Chunks: {manifest['count']} x {manifest['dimension']} dims")
+
+def import_index(path: str):
+    if not os.path.exists(path):
+        print(f"✗ Snapshot not found: {path}")
+        return
+
+    vector_store = VectorStore(persist_directory=config.VECTOR_DB_PATH)
+    manifest = vector_store.import_snapshot(path)
+
+    chunking = manifest.get('chunking', {})
+    if chunking and (
+        chunking.get('chunk_size') != config.CHUNK_SIZE
+        or chunking.get('chunk_overlap') != config.CHUNK_OVERLAP
+    ):
+        print(
+            f"⚠ Snapshot chunking ({chunking.get('chunk_size')}/{chunking.get('chunk_overlap')}) "
+            f"differs from current config ({config.CHUNK_SIZE}/{config.CHUNK_OVERLAP})"
+        )
+
+    stats = vector_store.get_collection_stats()
+    print(f"Collection: {stats['collection_name']}")
+    print(f"Total chunks: {stats['total_chunks']}")
+    print(f"Storage location: {stats['persist_directory']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import a vector index snapshot")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Write the indexed collection to a snapshot file")
+    export_parser.add_argument("--path", default=config.SNAPSHOT_PATH)
+    export_parser.add_argument("--dtype", default=config.SNAPSHOT_DTYPE, choices=["float16", "int8"])
+
+    import_parser = subparsers.add_parser("import", help="Replace the collection with a snapshot file")
+    import_parser.add_argument("--path", default=config.SNAPSHOT_PATH)
+
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"Tesla Cybertruck Index Snapshot: {args.command}")
+    print("=" * 60)
+
+    if args.command == "export":
+        export_index(args.path, args.dtype)
+    else:
+        import_index(args.path)
+
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+
+class AssetStore:
+    def __init__(self, root_dir: str = "assets"):
+        self.root_dir = root_dir
+
+    @staticmethod
+    def file_hash(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _file_dir(self, file_hash: str) -> str:
+        path = os.path.join(self.root_dir, file_hash)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _write_atomic(self, path: str, data: bytes) -> None:
+        # Several extraction workers may race on the same file; the rename keeps readers safe
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def save_image(self, file_hash: str, page_number: int, index: int, data: bytes, ext: str) -> str:
+        name = f"page_{page_number:04d}_img_{index:02d}.{ext}"
+        path = os.path.join(self._file_dir(file_hash), name)
+        if not os.path.exists(path):
+            self._write_atomic(path, data)
+        return f"{file_hash}/{name}"
+
+    def resolve(self, ref: str) -> str:
+        path = os.path.normpath(os.path.join(self.root_dir, ref))
+        if not path.startswith(os.path.normpath(self.root_dir) + os.sep):
+            raise ValueError(f"Invalid asset reference: {ref}")
+        return path
+
+    def exists(self, ref: str) -> bool:
+        return os.path.exists(self.resolve(ref))
+
+    def load(self, ref: str) -> bytes:
+        with open(self.resolve(ref), "rb") as f:
+            return f.read()
+
+    def load_pages(self, file_hash: str, options: Dict) -> Optional[List[Dict]]:
+        path = os.path.join(self.root_dir, file_hash, "pages.json")
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if cached.get("options") != options:
+            return None
+        return cached["pages"]
+
+    def save_pages(self, file_hash: str, options: Dict, pages: List[Dict]) -> None:
+        path = os.path.join(self._file_dir(file_hash), "pages.json")
+        data = json.dumps({"options": options, "pages": pages}, ensure_ascii=False)
+        self._write_atomic(path, data.encode("utf-8"))
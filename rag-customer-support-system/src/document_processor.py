@@ -1,36 +1,144 @@
 import fitz  # PyMuPDF
 import os
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Dict
 import tiktoken
+from src.asset_store import AssetStore
 
-class DocumentProcessor:
-    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50):
-        self.chunk_size = chunk_size
-        self.chunk_overlap = chunk_overlap
-        self.encoding = tiktoken.get_encoding("cl100k_base")
+EXTRACTOR_VERSION = 2
+MIN_IMAGE_SIZE = 100
 
-    def load_pdf(self, pdf_path: str) -> List[Dict[str, any]]:
-        pages = []
-        filename = os.path.basename(pdf_path)
 
+def _table_to_markdown(rows: List[List]) -> str:
+    rows = [
+        [" ".join(str(cell).split()) if cell is not None else "" for cell in row]
+        for row in rows
+        if any(cell for cell in row)
+    ]
+    if not rows:
+        return ""
+
+    header, body = rows[0], rows[1:]
+    lines = [
+        "| " + " | ".join(header) + " |",
+        "| " + " | ".join("---" for _ in header) + " |"
+    ]
+    lines.extend("| " + " | ".join(row) + " |" for row in body)
+    return "\n".join(lines)
+
+
+def _extract_page(doc, page, file_hash: str, asset_store: AssetStore, extract_tables: bool, extract_images: bool) -> Dict:
+    tables = []
+    table_rects = []
+
+    if extract_tables:
         try:
-            doc = fitz.open(pdf_path)
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                text = page.get_text()
-
-                if text.strip():  # Only add non-empty pages
-                    pages.append({
-                        'text': text,
-                        'page_number': page_num + 1,
-                        'filename': filename
-                    })
-            doc.close()
-            print(f"✓ Loaded {filename}: {len(pages)} pages")
+            for table in page.find_tables().tables:
+                markdown = _table_to_markdown(table.extract())
+                if markdown:
+                    tables.append(markdown)
+                    table_rects.append(fitz.Rect(table.bbox))
         except Exception as e:
-            print(f"✗ Error loading {pdf_path}: {e}")
+            print(f"  ⚠ Table detection failed on page {page.number + 1}: {e}")
+
+    if table_rects:
+        # Keep only prose outside the tables so cell text is not indexed twice in flattened form
+        blocks = page.get_text("blocks")
+        text = "\n".join(
+            block[4] for block in blocks
+            if block[6] == 0 and not any(fitz.Rect(block[:4]).intersects(rect) for rect in table_rects)
+        )
+    else:
+        text = page.get_text()
+
+    image_refs = []
+    if extract_images:
+        for index, image in enumerate(page.get_images(full=True)):
+            xref, width, height = image[0], image[2], image[3]
+            if width < MIN_IMAGE_SIZE or height < MIN_IMAGE_SIZE:
+                continue
+            extracted = doc.extract_image(xref)
+            if extracted and extracted.get("image"):
+                image_refs.append(asset_store.save_image(
+                    file_hash, page.number + 1, index, extracted["image"], extracted.get("ext", "png")
+                ))
+
+    return {
+        'text': text,
+        'tables': tables,
+        'image_refs': image_refs
+    }
+
+
+def extract_pdf(
+    pdf_path: str,
+    asset_dir: str = "assets",
+    extract_tables: bool = True,
+    extract_images: bool = True
+) -> List[Dict]:
+    # Module-level so it can run in a worker process
+    filename = os.path.basename(pdf_path)
+    asset_store = AssetStore(asset_dir)
+    options = {
+        'extractor_version': EXTRACTOR_VERSION,
+        'extract_tables': extract_tables,
+        'extract_images': extract_images
+    }
+
+    try:
+        file_hash = AssetStore.file_hash(pdf_path)
+        cached = asset_store.load_pages(file_hash, options)
+        if cached is not None:
+            for page in cached:
+                page['filename'] = filename
+            print(f"✓ Loaded {filename} from extraction cache: {len(cached)} pages")
+            return cached
 
+        pages = []
+        doc = fitz.open(pdf_path)
+        for page_num in range(len(doc)):
+            page = doc[page_num]
+            extracted = _extract_page(doc, page, file_hash, asset_store, extract_tables, extract_images)
+
+            if extracted['text'].strip() or extracted['tables']:  # Only add non-empty pages
+                pages.append({
+                    **extracted,
+                    'page_number': page_num + 1,
+                    'filename': filename,
+                    'file_hash': file_hash
+                })
+        doc.close()
+
+        asset_store.save_pages(file_hash, options, pages)
+        num_tables = sum(len(page['tables']) for page in pages)
+        num_images = sum(len(page['image_refs']) for page in pages)
+        print(f"✓ Loaded {filename}: {len(pages)} pages, {num_tables} tables, {num_images} images")
         return pages
+    except Exception as e:
+        print(f"✗ Error loading {pdf_path}: {e}")
+        return []
+
+
+class DocumentProcessor:
+    def __init__(
+        self,
+        chunk_size: int = 500,
+        chunk_overlap: int = 50,
+        asset_dir: str = "assets",
+        extract_tables: bool = True,
+        extract_images: bool = True,
+        workers: int = 1
+    ):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.asset_dir = asset_dir
+        self.extract_tables = extract_tables
+        self.extract_images = extract_images
+        self.workers = workers
+        self.encoding = tiktoken.get_encoding("cl100k_base")
+
+    def load_pdf(self, pdf_path: str) -> List[Dict[str, any]]:
+        return extract_pdf(pdf_path, self.asset_dir, self.extract_tables, self.extract_images)
 
     def chunk_text(self, text: str, metadata: Dict) -> List[Dict]:
         tokens = self.encoding.encode(text)
@@ -59,17 +167,59 @@ class DocumentProcessor:
 
         return chunks
 
+    def chunk_table(self, table: str, metadata: Dict, first_chunk_id: int = 0) -> List[Dict]:
+        # Split on row boundaries and repeat the header so every chunk stays a readable table
+        lines = table.split("\n")
+        header, rows = lines[:2], lines[2:]
+        header_tokens = len(self.encoding.encode("\n".join(header)))
+
+        groups = []
+        current, current_tokens = [], header_tokens
+        for row in rows:
+            row_tokens = len(self.encoding.encode(row)) + 1
+            if current and current_tokens + row_tokens > self.chunk_size:
+                groups.append(current)
+                current, current_tokens = [], header_tokens
+            current.append(row)
+            current_tokens += row_tokens
+        groups.append(current)
+
+        return [
+            {
+                'text': f"Table (page {metadata['page_number']}):\n" + "\n".join(header + group),
+                'metadata': {
+                    **metadata,
+                    'content_type': 'table',
+                    'chunk_id': first_chunk_id + i
+                }
+            }
+            for i, group in enumerate(groups)
+        ]
+
+    def chunk_page(self, page: Dict) -> List[Dict]:
+        metadata = {
+            'filename': page['filename'],
+            'page_number': page['page_number']
+        }
+        if page.get('image_refs'):
+            # Chroma metadata values must be scalars, so references are stored comma-separated
+            metadata['image_refs'] = ",".join(page['image_refs'])
+
+        chunks = []
+        if page['text'].strip():
+            chunks = self.chunk_text(page['text'], {**metadata, 'content_type': 'text'})
+
+        for table in page.get('tables', []):
+            chunks.extend(self.chunk_table(table, metadata, first_chunk_id=len(chunks)))
+
+        return chunks
+
     def process_document(self, pdf_path: str) -> List[Dict]:
         pages = self.load_pdf(pdf_path)
         all_chunks = []
 
         for page in pages:
-            metadata = {
-                'filename': page['filename'],
-                'page_number': page['page_number']
-            }
-            chunks = self.chunk_text(page['text'], metadata)
-            all_chunks.extend(chunks)
+            all_chunks.extend(self.chunk_page(page))
 
         return all_chunks
 
@@ -81,13 +231,23 @@ class DocumentProcessor:
             return all_chunks
 
         pdf_files = [f for f in os.listdir(directory) if f.endswith('.pdf')]
+        pdf_paths = [os.path.join(directory, pdf_file) for pdf_file in pdf_files]
 
         print(f"\nProcessing {len(pdf_files)} PDF files from {directory}...")
 
-        for pdf_file in pdf_files:
-            pdf_path = os.path.join(directory, pdf_file)
-            chunks = self.process_document(pdf_path)
-            all_chunks.extend(chunks)
+        if self.workers > 1 and len(pdf_paths) > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                futures = [
+                    executor.submit(extract_pdf, path, self.asset_dir, self.extract_tables, self.extract_images)
+                    for path in pdf_paths
+                ]
+                documents = [future.result() for future in futures]
+        else:
+            documents = [self.load_pdf(path) for path in pdf_paths]
+
+        for pages in documents:
+            for page in pages:
+                all_chunks.extend(self.chunk_page(page))
 
         print(f"\n✓ Total chunks created: {len(all_chunks)}")
         return all_chunks
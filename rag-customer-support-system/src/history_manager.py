@@ -0,0 +1,160 @@
+import re
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+from typing import List, Dict, Optional
+import tiktoken
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "if", "of", "to", "in", "on", "for", "with",
+    "at", "by", "from", "is", "are", "was", "were", "be", "been", "it", "its", "this",
+    "that", "these", "those", "you", "your", "i", "we", "can", "do", "does", "how",
+    "what", "which", "will", "would", "should", "as", "not", "so", "there", "please"
+}
+
+# A leading continuation marker ("and the rear one?") or a question whose subject is a bare
+# pronoun ("does it ...", "is that ..."); pronouns later in the sentence are ordinary questions
+FOLLOW_UP_PATTERN = re.compile(
+    r"^(and|also|what about|how about|what if|tell me more|more|same|then|so)\b"
+    r"|^((what|how|why|when|where|which)\s+)?"
+    r"((is|are|was|were|does|do|did|can|could|will|would|should|has|have)\s+)?"
+    r"(it|its|that|this|those|these|they|them)\b",
+    re.IGNORECASE
+)
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+CITATION_PATTERN = re.compile(r"\[Source[^\]]*\]")
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def get_encoding():
+    # The encoding is downloaded on first use; offline hosts fall back to length estimates,
+    # and the failure is remembered so it is not retried for every engine. The lock makes
+    # engines created concurrently wait for one lookup instead of each trying the download.
+    global _encoding
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                print(f"⚠ tiktoken encoding unavailable, estimating token counts: {type(e).__name__}")
+                _encoding = False
+        return _encoding
+
+
+class HistoryManager:
+    def __init__(
+        self,
+        token_budget: int = 1500,
+        recent_messages: int = 4,
+        summary_tokens: int = 300,
+        follow_up_max_words: int = 12
+    ):
+        self.token_budget = token_budget
+        self.recent_messages = recent_messages
+        self.summary_tokens = summary_tokens
+        self.follow_up_max_words = follow_up_max_words
+        self.encoding = get_encoding()
+        self._summary_cache = OrderedDict()
+        self._summary_cache_size = 512
+
+    def count_tokens(self, text: str) -> int:
+        if not self.encoding:
+            # Roughly four characters per token for English
+            return len(text) // 4 + 1 if text else 0
+        return len(self.encoding.encode(text or ""))
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        if not self.encoding:
+            return text if len(text or "") <= max_tokens * 4 else text[:max_tokens * 4] + "…"
+        tokens = self.encoding.encode(text or "")
+        if len(tokens) <= max_tokens:
+            return text
+        return self.encoding.decode(tokens[:max_tokens]) + "…"
+
+    def _key_sentence(self, text: str) -> str:
+        text = CITATION_PATTERN.sub("", text)
+        sentences = [s.strip() for s in SENTENCE_SPLIT.split(text) if len(s.strip()) > 20]
+        if not sentences:
+            return text.strip()
+
+        frequencies = Counter(
+            word for word in WORD_PATTERN.findall(text.lower()) if word not in STOPWORDS
+        )
+
+        def score(sentence: str) -> float:
+            words = [w for w in WORD_PATTERN.findall(sentence.lower()) if w not in STOPWORDS]
+            if not words:
+                return 0.0
+            return sum(frequencies[w] for w in words) / len(words)
+
+        return max(sentences, key=score)
+
+    def _summarize_message(self, message: Dict) -> str:
+        content = message.get("content") or ""
+        key = hashlib.sha1(f"{message['role']}:{content}".encode("utf-8")).hexdigest()
+
+        if key in self._summary_cache:
+            self._summary_cache.move_to_end(key)
+            return self._summary_cache[key]
+
+        if message["role"] == "user":
+            line = f"- User asked: {self._truncate(content.strip(), 40)}"
+        else:
+            line = f"- Assistant answered: {self._truncate(self._key_sentence(content), 60)}"
+
+        self._summary_cache[key] = line
+        if len(self._summary_cache) > self._summary_cache_size:
+            self._summary_cache.popitem(last=False)
+        return line
+
+    def _summarize(self, messages: List[Dict]) -> Optional[str]:
+        lines = [self._summarize_message(m) for m in messages if m.get("content")]
+
+        # Drop the oldest lines first until the summary fits its budget
+        while lines and self.count_tokens("\n".join(lines)) > self.summary_tokens:
+            lines.pop(0)
+
+        if not lines:
+            return None
+        return "Summary of earlier conversation:\n" + "\n".join(lines)
+
+    def build_messages(self, conversation_history: List[Dict]) -> List[Dict]:
+        if not conversation_history:
+            return []
+
+        recent = []
+        used_tokens = 0
+        recent_budget = self.token_budget - self.summary_tokens
+
+        for message in reversed(conversation_history[-self.recent_messages:]):
+            tokens = self.count_tokens(message["content"])
+            if used_tokens + tokens > recent_budget:
+                if not recent:
+                    recent.append({
+                        "role": message["role"],
+                        "content": self._truncate(message["content"], recent_budget)
+                    })
+                break
+            recent.append({"role": message["role"], "content": message["content"]})
+            used_tokens += tokens
+
+        recent.reverse()
+        older = conversation_history[:len(conversation_history) - len(recent)]
+
+        messages = []
+        summary = self._summarize(older) if older else None
+        if summary:
+            messages.append({"role": "system", "content": summary})
+        messages.extend(recent)
+
+        return messages
+
+    def is_follow_up(self, user_message: str) -> bool:
+        words = user_message.split()
+        if not words or len(words) > self.follow_up_max_words:
+            return False
+        return bool(FOLLOW_UP_PATTERN.search(user_message.strip()))
@@ -1,23 +1,110 @@
 from openai import OpenAI
 from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
 import json
+import time
 from src.vector_store import VectorStore
 from src.ticket_manager import TicketManager
+from src.history_manager import HistoryManager
 import config
 
+# One pool for every engine in the process; a per-engine pool would leak threads with each session
+REWRITE_EXECUTOR = ThreadPoolExecutor(max_workers=config.QUERY_REWRITE_WORKERS, thread_name_prefix="query-rewrite")
+
 class RAGEngine:
-    def __init__(self):
-        self.client = OpenAI(api_key=config.OPENAI_API_KEY)
-        self.vector_store = VectorStore(persist_directory=config.VECTOR_DB_PATH)
+    def __init__(self, vector_store: Optional[VectorStore] = None):
+        self.client = OpenAI(api_key=config.OPENAI_API_KEY, base_url=config.OPENAI_BASE_URL)
+        self.vector_store = vector_store or VectorStore(persist_directory=config.VECTOR_DB_PATH)
         self.ticket_manager = TicketManager(
             github_token=config.GITHUB_TOKEN,
-            github_repo=config.GITHUB_REPO
+            github_repo=config.GITHUB_REPO,
+            api_base=config.GITHUB_API_BASE
+        )
+        self.history_manager = HistoryManager(
+            token_budget=config.HISTORY_TOKEN_BUDGET,
+            recent_messages=config.HISTORY_RECENT_MESSAGES,
+            summary_tokens=config.HISTORY_SUMMARY_TOKENS
         )
         self.conversation_history = []
+        self.last_sources = []
 
     def search_documents(self, query: str) -> List[Dict]:
         return self.vector_store.search(query, top_k=config.TOP_K_RESULTS)
 
+    def _should_rewrite(self, user_message: str, conversation_history: Optional[List[Dict]]) -> bool:
+        if config.QUERY_REWRITE_MODE == "always":
+            return True
+        if config.QUERY_REWRITE_MODE == "follow_up":
+            return bool(conversation_history) and self.history_manager.is_follow_up(user_message)
+        return False
+
+    def rewrite_query(self, user_message: str, conversation_history: Optional[List[Dict]] = None) -> List[str]:
+        history_lines = [
+            f"{msg['role']}: {msg['content'][:300]}"
+            for msg in (conversation_history or [])[-4:]
+        ]
+
+        response = self.client.with_options(
+            timeout=config.QUERY_REWRITE_TIMEOUT,
+            max_retries=0
+        ).chat.completions.create(
+            model=config.QUERY_REWRITE_MODEL,
+            messages=[
+                {"role": "system", "content": config.QUERY_REWRITE_PROMPT},
+                {"role": "user", "content": "Conversation:\n" + "\n".join(history_lines) + f"\n\nLatest question: {user_message}"}
+            ],
+            response_format={"type": "json_object"},
+            temperature=0,
+            max_tokens=150
+        )
+
+        data = json.loads(response.choices[0].message.content)
+        candidates = [data.get('query', '')] + list(data.get('paraphrases', []))[:config.QUERY_REWRITE_PARAPHRASES]
+
+        queries = []
+        for candidate in candidates:
+            if isinstance(candidate, str) and candidate.strip() and candidate.strip() not in queries:
+                queries.append(candidate.strip())
+        return queries
+
+    @staticmethod
+    def fuse_results(result_lists: List[List[Dict]], top_k: int, k: int = 60) -> List[Dict]:
+        # Reciprocal rank fusion: chunks ranked well by several queries float to the top
+        scores = {}
+        chunks = {}
+        for results in result_lists:
+            for rank, result in enumerate(results):
+                key = result.get('id') or result['text']
+                scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+                chunks.setdefault(key, result)
+
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        return [chunks[key] for key in ranked[:top_k]]
+
+    def retrieve(self, user_message: str, conversation_history: Optional[List[Dict]] = None) -> List[Dict]:
+        if not self._should_rewrite(user_message, conversation_history):
+            return self.search_documents(user_message)
+
+        deadline = time.time() + config.QUERY_REWRITE_TIMEOUT
+        rewrite_future = REWRITE_EXECUTOR.submit(self.rewrite_query, user_message, conversation_history)
+
+        # The raw query is searched while the rewrite is in flight, so a slow rewrite costs nothing extra
+        raw_results = self.search_documents(user_message)
+
+        try:
+            queries = rewrite_future.result(timeout=max(0.0, deadline - time.time()))
+        except Exception as e:
+            # A rewrite still queued behind other sessions is dropped rather than sent late
+            rewrite_future.cancel()
+            print(f"⚠ Query rewrite skipped, using raw query: {type(e).__name__}")
+            return raw_results
+
+        if not queries:
+            return raw_results
+
+        result_lists = self.vector_store.search_batch(queries, top_k=config.TOP_K_RESULTS)
+        return self.fuse_results(result_lists + [raw_results], top_k=config.TOP_K_RESULTS)
+
     def format_context(self, results: List[Dict]) -> str:
         if not results:
             return "No relevant information found in the documentation."
@@ -38,7 +125,22 @@ class RAGEngine:
         user_message: str,
         conversation_history: Optional[List[Dict]] = None
     ) -> Dict:
-        search_results = self.search_documents(user_message)
+        merge_previous = bool(
+            config.REUSE_FOLLOW_UP_SOURCES
+            and config.QUERY_REWRITE_MODE == "off"
+            and conversation_history
+            and self.last_sources
+            and self.history_manager.is_follow_up(user_message)
+        )
+
+        # Every question is searched. A follow-up also lets the previous turn's sources compete in the
+        # fused ranking, but only fresh results are remembered, so old chunks do not drift into later turns.
+        fresh_results = self.retrieve(user_message, conversation_history)
+        search_results = fresh_results
+        if merge_previous:
+            search_results = self.fuse_results([fresh_results, self.last_sources], top_k=config.TOP_K_RESULTS)
+        self.last_sources = fresh_results
+
         context = self.format_context(search_results)
 
         messages = [
@@ -46,7 +148,10 @@ class RAGEngine:
         ]
 
         if conversation_history:
-            messages.extend(conversation_history[-10:])
+            if config.HISTORY_MODE == "rolling":
+                messages.extend(self.history_manager.build_messages(conversation_history))
+            else:
+                messages.extend(conversation_history[-10:])
 
         user_content = f"""User Question: {user_message}
 
@@ -0,0 +1,146 @@
+import json
+import os
+import struct
+import zlib
+from typing import Dict, List, Optional
+
+import numpy as np
+
+MAGIC = b"RAGSNAP1"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+SUPPORTED_DTYPES = ("float16", "int8")
+
+_HEADER = struct.Struct("<8sQ")
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _quantize(embeddings: np.ndarray, dtype: str):
+    if dtype == "float16":
+        return embeddings.astype(np.float16), None
+
+    # Symmetric per-row int8 quantization; the scale restores the original range
+    scales = np.abs(embeddings).max(axis=1).astype(np.float32) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.clip(np.rint(embeddings / scales[:, None]), -127, 127).astype(np.int8)
+    return quantized, scales
+
+
+def write_snapshot(
+    path: str,
+    ids: List[str],
+    embeddings: np.ndarray,
+    texts: List[str],
+    metadatas: List[Dict],
+    manifest: Dict,
+    dtype: str = "float16"
+) -> Dict:
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError(f"Unsupported snapshot dtype: {dtype}. Use one of {SUPPORTED_DTYPES}")
+
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if embeddings.ndim != 2 or embeddings.shape[0] != len(ids):
+        raise ValueError("Embeddings must be a 2-D array with one row per chunk")
+
+    vectors, scales = _quantize(embeddings, dtype)
+
+    payload = zlib.compress(
+        json.dumps(
+            {"ids": ids, "texts": texts, "metadatas": metadatas},
+            ensure_ascii=False,
+            separators=(",", ":")
+        ).encode("utf-8"),
+        level=9
+    )
+
+    manifest = {
+        **manifest,
+        "format_version": FORMAT_VERSION,
+        "count": int(embeddings.shape[0]),
+        "dimension": int(embeddings.shape[1]),
+        "dtype": dtype,
+        "payload_length": len(payload),
+        "payload_crc32": zlib.crc32(payload),
+    }
+
+    # Offsets are stored in the manifest itself, so re-encode until the header size settles
+    manifest.update({"embeddings_offset": 0, "scales_offset": 0, "payload_offset": 0})
+    header_bytes = json.dumps(manifest, sort_keys=True).encode("utf-8")
+    while True:
+        embeddings_offset = _align(_HEADER.size + len(header_bytes))
+        scales_offset = _align(embeddings_offset + vectors.nbytes)
+        payload_offset = scales_offset + (scales.nbytes if scales is not None else 0)
+        manifest.update({
+            "embeddings_offset": embeddings_offset,
+            "scales_offset": scales_offset if scales is not None else 0,
+            "payload_offset": payload_offset,
+        })
+        header_bytes = json.dumps(manifest, sort_keys=True).encode("utf-8")
+        if _align(_HEADER.size + len(header_bytes)) == embeddings_offset:
+            break
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * (embeddings_offset - f.tell()))
+        f.write(vectors.tobytes())
+        if scales is not None:
+            f.write(b"\0" * (scales_offset - f.tell()))
+            f.write(scales.tobytes())
+        f.write(b"\0" * (payload_offset - f.tell()))
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+    return manifest
+
+
+def read_manifest(path: str) -> Dict:
+    with open(path, "rb") as f:
+        magic, header_length = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"Not a RAG index snapshot: {path}")
+        manifest = json.loads(f.read(header_length).decode("utf-8"))
+
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format version: {manifest.get('format_version')}")
+
+    return manifest
+
+
+def read_embeddings(path: str, manifest: Optional[Dict] = None, mmap: bool = True) -> np.ndarray:
+    manifest = manifest or read_manifest(path)
+    shape = (manifest["count"], manifest["dimension"])
+    dtype = np.float16 if manifest["dtype"] == "float16" else np.int8
+
+    if mmap:
+        vectors = np.memmap(path, dtype=dtype, mode="r", offset=manifest["embeddings_offset"], shape=shape)
+    else:
+        with open(path, "rb") as f:
+            f.seek(manifest["embeddings_offset"])
+            vectors = np.frombuffer(f.read(shape[0] * shape[1] * np.dtype(dtype).itemsize), dtype=dtype).reshape(shape)
+
+    if manifest["dtype"] == "float16":
+        return vectors.astype(np.float32)
+
+    with open(path, "rb") as f:
+        f.seek(manifest["scales_offset"])
+        scales = np.frombuffer(f.read(shape[0] * 4), dtype=np.float32)
+    return vectors.astype(np.float32) * scales[:, None]
+
+
+def read_records(path: str, manifest: Optional[Dict] = None) -> Dict:
+    manifest = manifest or read_manifest(path)
+
+    with open(path, "rb") as f:
+        f.seek(manifest["payload_offset"])
+        payload = f.read(manifest["payload_length"])
+
+    if zlib.crc32(payload) != manifest["payload_crc32"]:
+        raise ValueError(f"Snapshot payload is corrupted: {path}")
+
+    return json.loads(zlib.decompress(payload).decode("utf-8"))
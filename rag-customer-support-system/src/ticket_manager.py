@@ -4,10 +4,10 @@ from typing import Dict, Optional
 from datetime import datetime
 
 class TicketManager:
-    def __init__(self, github_token: str, github_repo: str):
+    def __init__(self, github_token: str, github_repo: str, api_base: str = "https://api.github.com"):
         self.github_token = github_token
         self.github_repo = github_repo
-        self.api_base = "https://api.github.com"
+        self.api_base = api_base.rstrip("/")
         self.headers = {
             "Authorization": f"token {github_token}",
             "Accept": "application/vnd.github.v3+json"
@@ -1,8 +1,10 @@
 import chromadb
 from chromadb.config import Settings
 from sentence_transformers import SentenceTransformer
-from typing import List, Dict
+from typing import List, Dict, Optional
 import os
+import time
+from src import snapshot
 
 class VectorStore:
     def __init__(self, persist_directory: str = "chroma_db"):
@@ -11,7 +13,8 @@ class VectorStore:
             path=persist_directory,
             settings=Settings(anonymized_telemetry=False)
         )
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.embedding_model_name = 'all-MiniLM-L6-v2'
+        self.embedding_model = SentenceTransformer(self.embedding_model_name)
         self.collection_name = "cybertruck_docs"
 
         try:
@@ -54,6 +57,19 @@ class VectorStore:
 
         print(f"✓ Successfully indexed all chunks")
 
+    def _format_results(self, results: Dict, index: int = 0) -> List[Dict]:
+        formatted_results = []
+        if results['documents'] and results['documents'][index]:
+            for i in range(len(results['documents'][index])):
+                formatted_results.append({
+                    'id': results['ids'][index][i],
+                    'text': results['documents'][index][i],
+                    'metadata': results['metadatas'][index][i],
+                    'distance': results['distances'][index][i] if 'distances' in results else None
+                })
+
+        return formatted_results
+
     def search(self, query: str, top_k: int = 3) -> List[Dict]:
         query_embedding = self.embedding_model.encode([query])[0]
 
@@ -62,17 +78,21 @@ class VectorStore:
             n_results=top_k
         )
 
-        # Format results
-        formatted_results = []
-        if results['documents'] and results['documents'][0]:
-            for i in range(len(results['documents'][0])):
-                formatted_results.append({
-                    'text': results['documents'][0][i],
-                    'metadata': results['metadatas'][0][i],
-                    'distance': results['distances'][0][i] if 'distances' in results else None
-                })
+        return self._format_results(results)
 
-        return formatted_results
+    def search_batch(self, queries: List[str], top_k: int = 3) -> List[List[Dict]]:
+        if not queries:
+            return []
+
+        # One encoder pass and one collection query for all queries
+        query_embeddings = self.embedding_model.encode(queries)
+
+        results = self.collection.query(
+            query_embeddings=query_embeddings.tolist(),
+            n_results=top_k
+        )
+
+        return [self._format_results(results, i) for i in range(len(queries))]
 
     def get_collection_stats(self) -> Dict:
         count = self.collection.count()
@@ -89,3 +109,63 @@ class VectorStore:
             metadata={"description": "Tesla Cybertruck documentation"}
         )
         print(f"✓ Cleared collection: {self.collection_name}")
+
+    def export_snapshot(
+        self,
+        path: str,
+        dtype: str = "float16",
+        chunking: Optional[Dict] = None
+    ) -> Dict:
+        start_time = time.time()
+        data = self.collection.get(include=["embeddings", "documents", "metadatas"])
+
+        if not data['ids']:
+            raise ValueError(f"Collection {self.collection_name} is empty, nothing to export")
+
+        manifest = snapshot.write_snapshot(
+            path,
+            ids=data['ids'],
+            embeddings=data['embeddings'],
+            texts=data['documents'],
+            metadatas=data['metadatas'],
+            manifest={
+                'collection_name': self.collection_name,
+                'embedding_model': self.embedding_model_name,
+                'chunking': chunking or {},
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+            },
+            dtype=dtype
+        )
+
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        print(f"✓ Exported {manifest['count']} chunks to {path} ({size_mb:.2f} MB, {dtype}) in {time.time() - start_time:.2f}s")
+        return manifest
+
+    def import_snapshot(self, path: str, batch_size: int = 5000) -> Dict:
+        start_time = time.time()
+        manifest = snapshot.read_manifest(path)
+
+        if manifest['embedding_model'] != self.embedding_model_name:
+            raise ValueError(
+                f"Snapshot was built with {manifest['embedding_model']}, "
+                f"but this store uses {self.embedding_model_name}"
+            )
+
+        embeddings = snapshot.read_embeddings(path, manifest)
+        records = snapshot.read_records(path, manifest)
+
+        self.clear_collection()
+
+        total = manifest['count']
+        for i in range(0, total, batch_size):
+            end_idx = min(i + batch_size, total)
+            self.collection.add(
+                embeddings=embeddings[i:end_idx].tolist(),
+                documents=records['texts'][i:end_idx],
+                metadatas=records['metadatas'][i:end_idx],
+                ids=records['ids'][i:end_idx]
+            )
+            print(f"  Loaded {end_idx}/{total} chunks")
+
+        print(f"✓ Imported {total} chunks from {path} in {time.time() - start_time:.2f}s")
+        return manifest